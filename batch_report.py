@@ -0,0 +1,241 @@
+# batch_report.py
+# Alekya Veluri
+#
+# Headless batch rendering of the gbas sentiment charts. Books are analyzed and drawn in worker
+# processes with the non-interactive Agg backend, one reused figure per worker, and the charts are
+# written as PNG/SVG files next to an index.html page linking all of them.
+#
+# Usage: python batch_report.py "books/*.txt" [more files or globs] --output-dir reports [--format png svg]
+
+# import necessary libraries, matplotlib is imported by the workers that draw
+import argparse
+import glob
+import html
+import os
+import re
+import sys
+
+import gbas
+from sentiment_analyzer import SentimentAnalyzer, ensure_resources
+
+# figure size of every chart, in inches
+FIGURE_SIZE = (10, 6)
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def expand_inputs(patterns):
+    """
+    Expands a list of file names and glob patterns ('**' matches subdirectories) into a list
+    of paths, in the order given, without duplicates. Names without glob characters are kept
+    even if they do not exist so that the error is reported for that book.
+    """
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            paths.extend(sorted(glob.glob(pattern, recursive=True)))
+        else:
+            paths.append(pattern)
+    return list(dict.fromkeys(paths))
+
+#``````````````````````````````````````````````````````````````````````````````````
+def new_figure():
+    """
+    Creates a figure drawn by the Agg canvas directly, without pyplot or a display.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    figure = Figure(figsize=FIGURE_SIZE)
+    FigureCanvasAgg(figure)
+    return figure
+
+#``````````````````````````````````````````````````````````````````````````````````
+def render_book(path, analyzer, output_dir, formats=('png',), figure=None, window_size=20, file_stem=None, store=None):
+    """
+    Analyzes one book with gbas.analyze_book (reusing results saved in store, a ResultStore,
+    if given) and saves its chart in each format to output_dir. figure is cleared and
+    reused if given. Returns a record dict with the path,
+    title, chapter counts, overall Gutenberg score, image file names and error (None on
+    success, otherwise the message, so one bad book does not stop a batch).
+    """
+    record = {'path': path, 'title': os.path.basename(path), 'chapters': 0, 'fake_chapters': 0,
+              'lines_per_chapter': 0, 'overall_score': None, 'images': [], 'error': None}
+    try:
+        book = gbas.analyze_book(path, analyzer, window_size=window_size, workers=1, store=store)
+        record.update(title=book['title'], chapters=len(book['gutenberg_scores']), fake_chapters=len(book['fake_scores']),
+                      lines_per_chapter=book['lines_per_chapter'])
+        if book['gutenberg_scores']:
+            record['overall_score'] = sum(book['gutenberg_scores']) / len(book['gutenberg_scores'])
+
+        if figure is None:
+            figure = new_figure()
+        figure.clear()
+        gbas.draw_dual_sentiment(figure.add_subplot(), book['gutenberg_average'], book['fake_average'],
+                                 "Chapters from Gutenberg", f"Chapters with {book['lines_per_chapter']} lines per chapter",
+                                 book['title'])
+        stem = file_stem or _file_stem(book['title'])
+        for image_format in formats:
+            name = f"{stem}.{image_format}"
+            figure.savefig(os.path.join(output_dir, name), format=image_format)
+            record['images'].append(name)
+    except Exception as error:
+        record['error'] = f"{type(error).__name__}: {error}"
+    return record
+
+#``````````````````````````````````````````````````````````````````````````````````
+def render_reports(paths, output_dir, analyzer=None, workers=None, formats=('png',), window_size=20, chunksize=1, store=None):
+    """
+    Renders a chart for every book across a pool of worker processes (workers=1 renders in
+    this process) and writes index.html to output_dir. Each worker receives the analyzer
+    (and the ResultStore, if given, with its own connection) once and reuses one figure for
+    all of its books. Returns the records of render_book,
+    in the order of paths.
+    """
+    if analyzer is None:
+        analyzer = SentimentAnalyzer(gbas.starter_positive_words, gbas.starter_negative_words, gbas.starter_negation_words,
+                                     gbas.starter_intensifiers, gbas.starter_downtoners)
+    os.makedirs(output_dir, exist_ok=True)
+    paths = list(paths)
+    stems = _unique_stems(paths)
+
+    if workers == 1: # no pool needed
+        figure = new_figure()
+        records = [render_book(path, analyzer, output_dir, formats, figure, window_size, stem, store) for path, stem in zip(paths, stems)]
+    else:
+        from concurrent.futures import ProcessPoolExecutor # multiprocessing is only imported by batch jobs
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(analyzer, output_dir, tuple(formats), window_size, store)) as executor:
+            records = list(executor.map(_render_in_worker, zip(paths, stems), chunksize=chunksize))
+
+    write_index(records, output_dir)
+    return records
+
+#``````````````````````````````````````````````````````````````````````````````````
+def write_index(records, output_dir, title="Sentiment reports"):
+    """
+    Writes index.html to output_dir with one row per book: its title, chapter counts,
+    overall score and links to its charts, or the error if rendering failed.
+    """
+    rows = []
+    for record in records:
+        name = html.escape(record['title'])
+        if record['error']:
+            rows.append(f"<tr><td>{name}</td><td colspan=\"4\" class=\"error\">{html.escape(record['error'])}</td></tr>")
+            continue
+        score = "-" if record['overall_score'] is None else f"{record['overall_score']:.4f}"
+        images = " ".join(f"<a href=\"{html.escape(image)}\">{html.escape(image.rsplit('.', 1)[1].upper())}</a>"
+                          for image in record['images'])
+        preview = next((image for image in record['images'] if not image.endswith('.svg')), record['images'][0])
+        rows.append(f"<tr><td>{name}<br><a href=\"{html.escape(preview)}\"><img src=\"{html.escape(preview)}\" width=\"400\"></a></td>"
+                    f"<td>{record['chapters']}</td><td>{record['fake_chapters']} x {record['lines_per_chapter']} lines</td>"
+                    f"<td>{score}</td><td>{images}</td></tr>")
+
+    page = f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+<style>
+body {{ font-family: sans-serif; }}
+table {{ border-collapse: collapse; }}
+td, th {{ border: 1px solid #ccc; padding: 4px 8px; vertical-align: top; }}
+.error {{ color: #b00; }}
+</style>
+</head>
+<body>
+<h1>{html.escape(title)}</h1>
+<table>
+<tr><th>Book</th><th>Chapters</th><th>Fake chapters</th><th>Overall score</th><th>Charts</th></tr>
+{chr(10).join(rows)}
+</table>
+</body>
+</html>
+"""
+    index_path = os.path.join(output_dir, "index.html")
+    with open(index_path, "w", encoding="utf-8") as file:
+        file.write(page)
+    return index_path
+
+#``````````````````````````````````````````````````````````````````````````````````
+def print_summary(records, output_dir):
+    """
+    Prints how many charts were written and every book that failed. Returns the exit status,
+    1 if any book failed and 0 otherwise.
+    """
+    failed = [record for record in records if record['error']]
+    print(f"Wrote {len(records) - len(failed)} charts and {os.path.join(output_dir, 'index.html')}")
+    for record in failed:
+        print(f"Failed {record['path']}: {record['error']}")
+    return 1 if failed else 0
+
+#``````````````````````````````````````````````````````````````````````````````````
+def _file_stem(title):
+    """Turns a book title into a safe file name stem."""
+    return re.sub(r"[^\w.-]+", "_", title).strip("._") or "book"
+
+def _unique_stems(paths):
+    """Returns one file name stem per path, numbering books whose titles collide."""
+    stems = []
+    used = set()
+    for path in paths:
+        stem = base = _file_stem(os.path.basename(path).replace('.txt', ''))
+        number = 2
+        while stem in used:
+            stem = f"{base}_{number}"
+            number += 1
+        used.add(stem)
+        stems.append(stem)
+    return stems
+
+#``````````````````````````````````````````````````````````````````````````````````
+# helpers for the process pool used by render_reports
+
+# settings and reused figure of the current worker process, set once by _init_worker
+_worker_settings = None
+_worker_figure = None
+
+def _init_worker(analyzer, output_dir, formats, window_size, store):
+    """Stores the settings shipped to this worker process and creates its figure."""
+    global _worker_settings, _worker_figure
+    _worker_settings = (analyzer, output_dir, formats, window_size, store)
+    _worker_figure = new_figure()
+
+def _render_in_worker(job):
+    """Renders one book with the worker's analyzer and figure."""
+    path, stem = job
+    analyzer, output_dir, formats, window_size, store = _worker_settings
+    return render_book(path, analyzer, output_dir, formats, _worker_figure, window_size, stem, store)
+
+#``````````````````````````````````````````````````````````````````````````````````
+# main script for batch reports
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render sentiment charts for many books without a display.")
+    parser.add_argument("files", nargs="+", help="text files or glob patterns")
+    parser.add_argument("--output-dir", default="reports", help="directory for the charts and index.html")
+    parser.add_argument("--format", dest="formats", nargs="+", default=["png"], choices=["png", "svg"], help="image formats")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--window-size", type=int, default=20, help="moving average window in chapters")
+    parser.add_argument("--tokenizer", default=None, help="tokenizer backend ('nltk' or 'regex')")
+    parser.add_argument("--engine", default=None, help="scoring engine ('python' or 'vectorized')")
+    parser.add_argument("--store", metavar="FILE", help="SQLite result store, unchanged books are not analyzed again")
+    parser.add_argument("--store-max-mb", type=float, default=1024, help="size of the result store before old entries are evicted")
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.files)
+    if not paths:
+        print("No input files matched")
+        return 1
+    if args.tokenizer in (None, 'nltk'): # the nltk tokenizer needs the Punkt data
+        ensure_resources(download=True)
+
+    analyzer = SentimentAnalyzer(gbas.starter_positive_words, gbas.starter_negative_words, gbas.starter_negation_words,
+                                 gbas.starter_intensifiers, gbas.starter_downtoners, tokenizer=args.tokenizer, engine=args.engine)
+    store = None
+    if args.store:
+        from result_store import ResultStore
+        store = ResultStore(args.store, int(args.store_max_mb * 1024 * 1024))
+    records = render_reports(paths, args.output_dir, analyzer, args.workers, args.formats, args.window_size, store=store)
+    return print_summary(records, args.output_dir)
+
+if __name__ == "__main__":
+    sys.exit(main())
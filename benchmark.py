@@ -0,0 +1,207 @@
+# benchmark.py
+# Alekya Veluri
+#
+# Offline benchmark harness for the analyzer. Builds a deterministic synthetic Gutenberg book, times
+# each stage of the pipeline and compares the throughput against a saved JSON baseline.
+#
+# Usage: python benchmark.py [--chapters N] [--save-baseline FILE] [--compare FILE]
+
+# import necessary libraries
+import argparse
+import json
+import platform
+import sys
+import time
+
+import gbas
+from sentiment_analyzer import SentimentAnalyzer, ensure_resources
+from synthetic_books import generate_book
+
+# settings which must match between a run and its baseline for the timings to be comparable
+baseline_settings = ('tokenizer', 'engine', 'seed', 'chapters', 'lines_per_chapter')
+
+#``````````````````````````````````````````````````````````````````````````````````
+# function which returns the peak resident set size of this process in megabytes
+
+def process_peak_rss_mb():
+    """
+    High-water mark of the resident set size of the whole process in MB, so it never goes
+    down between stages. None where the resource module is missing (Windows).
+    """
+    try:
+        import resource # Unix only
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin": # bytes on macOS, kilobytes elsewhere
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+#``````````````````````````````````````````````````````````````````````````````````
+# function which times a stage, keeping the best of several repeats
+
+def time_stage(function, repeat=3):
+    """
+    Run function once untimed to warm up caches and lazy imports, then repeat times, and
+    return (best seconds, result of the last run).
+    """
+    result = function()
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+#``````````````````````````````````````````````````````````````````````````````````
+# function which runs every benchmark stage on one synthetic book
+
+def run_benchmarks(chapters=40, lines_per_chapter=120, seed=0, tokenizer=None, engine=None, repeat=3, window_size=20):
+    """
+    Times every stage of the pipeline on a synthetic book and returns a dict with one entry per
+    stage (seconds, sentences/sec, tokens/sec and the process peak RSS after the stage) plus the
+    settings and the corpus size.
+    """
+    analyzer = SentimentAnalyzer(gbas.starter_positive_words, gbas.starter_negative_words, gbas.starter_negation_words,
+                                 gbas.starter_intensifiers, gbas.starter_downtoners, tokenizer=tokenizer, engine=engine)
+    lines = generate_book(chapters, lines_per_chapter, seed)
+    stages = {}
+
+    # add a stage to the report
+    def record(name, seconds, sentences=None, tokens=None):
+        stages[name] = {
+            'seconds': seconds,
+            'sentences_per_sec': sentences / seconds if sentences and seconds else None,
+            'tokens_per_sec': tokens / seconds if tokens and seconds else None,
+            'process_peak_rss_mb': process_peak_rss_mb(),
+        }
+
+    # text extraction and chapter splitting
+    seconds, glines = time_stage(lambda: gbas.extract_gutenberg_text(lines), repeat)
+    record('extract_gutenberg_text', seconds)
+    seconds, chapter_lines = time_stage(lambda: gbas.extract_chapters_from_gutenberg_lines(glines), repeat)
+    record('extract_chapters', seconds)
+
+    # sentence and word tokenization
+    seconds, sentences = time_stage(lambda: analyzer.get_sentences_from_lines(glines), repeat)
+    record('sentence_tokenize', seconds, len(sentences))
+    seconds, words = time_stage(lambda: [analyzer.tokenizer.word_tokenize(sentence) for sentence in sentences], repeat)
+    token_count = sum(len(sentence_words) for sentence_words in words)
+    record('word_tokenize', seconds, len(sentences), token_count)
+
+    # sentence scoring and whole chapter analysis
+    seconds, scores = time_stage(lambda: [analyzer.analyze_sentence_sentiment(sentence, True, True) for sentence in sentences], repeat)
+    record('analyze_sentence_sentiment', seconds, len(sentences), token_count)
+    seconds, results = time_stage(lambda: [analyzer.analyze_sentiment(text, True, True) for text in chapter_lines.values()], repeat)
+    record('analyze_sentiment', seconds, len(sentences), token_count)
+
+    # smoothing of the sentence score series
+    seconds, _ = time_stage(lambda: gbas.moving_average(scores, window_size), repeat)
+    record('moving_average', seconds, len(scores))
+
+    return {
+        'settings': {'chapters': chapters, 'lines_per_chapter': lines_per_chapter, 'seed': seed,
+                     'tokenizer': getattr(analyzer.tokenizer, 'name', None), 'engine': getattr(analyzer.engine, 'name', None),
+                     'repeat': repeat, 'python': platform.python_version()},
+        'corpus': {'lines': len(lines), 'chapters': len(chapter_lines), 'sentences': len(sentences), 'tokens': token_count},
+        'stages': stages,
+    }
+
+#``````````````````````````````````````````````````````````````````````````````````
+# function which lists the differences between the settings of a run and its baseline
+
+def baseline_mismatches(report, baseline):
+    """
+    Returns a list of messages, one per setting in baseline_settings or corpus size which
+    differs between the report and the baseline. Timings are only comparable if it is empty.
+    """
+    mismatches = []
+    for section, names in (('settings', baseline_settings), ('corpus', tuple(report['corpus']))):
+        for name in names:
+            value = report[section].get(name)
+            base = baseline.get(section, {}).get(name)
+            if value != base:
+                mismatches.append(f"{name}: {value!r} vs baseline {base!r}")
+    return mismatches
+
+#``````````````````````````````````````````````````````````````````````````````````
+# function which compares a run with a saved baseline
+
+def compare_with_baseline(report, baseline, threshold=0.2):
+    """
+    Returns a list of regression messages for stages whose time grew by more than threshold
+    (0.2 = 20%) compared with the baseline report. Stages missing from either report are skipped.
+    Raises ValueError if the run and the baseline were recorded with different settings.
+    """
+    mismatches = baseline_mismatches(report, baseline)
+    if mismatches:
+        raise ValueError("baseline was recorded with different settings: " + "; ".join(mismatches))
+
+    regressions = []
+    for name, stage in report['stages'].items():
+        base = baseline.get('stages', {}).get(name)
+        if base is None or not base['seconds']:
+            continue
+        ratio = stage['seconds'] / base['seconds']
+        if ratio > 1 + threshold:
+            regressions.append(f"{name}: {stage['seconds']:.4f}s vs baseline {base['seconds']:.4f}s ({ratio:.2f}x)")
+    return regressions
+
+#``````````````````````````````````````````````````````````````````````````````````
+# function which prints a report as a table
+
+def print_report(report):
+    """Print the stage timings of a report as a table."""
+    corpus = report['corpus']
+    print(f"{corpus['lines']} lines, {corpus['chapters']} chapters, {corpus['sentences']} sentences, {corpus['tokens']} tokens")
+    print(f"{'stage':<28}{'seconds':>10}{'sentences/s':>14}{'tokens/s':>14}{'process peak MB':>17}")
+    for name, stage in report['stages'].items():
+        sentences = f"{stage['sentences_per_sec']:.0f}" if stage['sentences_per_sec'] else "-"
+        tokens = f"{stage['tokens_per_sec']:.0f}" if stage['tokens_per_sec'] else "-"
+        peak = f"{stage['process_peak_rss_mb']:.1f}" if stage['process_peak_rss_mb'] is not None else "-"
+        print(f"{name:<28}{stage['seconds']:>10.4f}{sentences:>14}{tokens:>14}{peak:>17}")
+
+#``````````````````````````````````````````````````````````````````````````````````
+# main script for the benchmark harness
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the sentiment analysis pipeline on synthetic books.")
+    parser.add_argument("--chapters", type=int, default=40, help="chapters in the synthetic book")
+    parser.add_argument("--lines-per-chapter", type=int, default=120, help="lines per synthetic chapter")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic book")
+    parser.add_argument("--tokenizer", default=None, help="tokenizer backend ('nltk' or 'regex')")
+    parser.add_argument("--engine", default=None, help="scoring engine ('python' or 'vectorized')")
+    parser.add_argument("--repeat", type=int, default=3, help="repeats per stage, the best time is kept")
+    parser.add_argument("--save-baseline", metavar="FILE", help="write the report to FILE as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="compare with a JSON baseline and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown per stage (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    if args.tokenizer in (None, 'nltk'): # the nltk tokenizer needs the Punkt data
+        ensure_resources(download=True)
+
+    report = run_benchmarks(args.chapters, args.lines_per_chapter, args.seed, args.tokenizer, args.engine, args.repeat)
+    print_report(report)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+        try:
+            regressions = compare_with_baseline(report, baseline, args.threshold)
+        except ValueError as error:
+            print(f"Cannot compare: {error}")
+            return 2
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print("No regressions against the baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
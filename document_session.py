@@ -0,0 +1,221 @@
+# document_session.py
+# Alekya Veluri
+#
+# Stateful analysis of a document that changes over time. Lines can be appended or replaced and
+# only the sentences of the changed lines are tokenized and scored again.
+
+# import necessary libraries
+import math
+from smoothing import MovingAverage
+
+
+class DocumentSession:
+    """
+    Keeps the lines of a document with the sentence scores of each line, and keeps the overall
+    score, the sentiment counts and the moving average of the latest sentence scores up to
+    date as lines change. Sentences never span lines (analyze_sentiment splits each line on
+    its own), so an edit only needs its own lines re-scored and its cost depends on the size
+    of the edit rather than the length of the document. The overall score is the exact
+    (math.fsum) sum of per-line sums, so it does not drift however many edits are made.
+    """
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __init__(self, analyzer, lines=(), use_negation=False, use_modifiers=False, window_size=20):
+        """
+        Creates a session scoring with analyzer and the given flags, starting from lines.
+        window_size is the window of the moving average over sentence scores.
+        """
+        self.analyzer = analyzer
+        self.use_negation = use_negation
+        self.use_modifiers = use_modifiers
+        self.window_size = window_size
+        self.lines = [] # text of each line
+        self.line_scores = [] # list of sentence scores for each line
+        self.line_totals = [] # math.fsum of the sentence scores of each line
+        self._total_score = 0 # sum of line_totals, None when it must be recomputed
+        self.sentence_count = 0
+        self.sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+        self.average = MovingAverage(window_size)
+        self.append_lines(lines)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _score_lines(self, lines):
+        """
+        Returns a list with the sentence scores of each line.
+        """
+        scores = [[] for _ in lines]
+        for _, score, line_number, _, _ in self.analyzer.iter_sentence_scores(lines, self.use_negation, self.use_modifiers):
+            scores[line_number].append(score)
+        return scores
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _add_scores(self, line_scores, sign):
+        """
+        Adds (sign=1) or removes (sign=-1) the sentence scores of some lines from the counts.
+        """
+        self._total_score = None # recomputed from line_totals when next needed
+        for scores in line_scores:
+            for score in scores:
+                self.sentence_count += sign
+                self.sentiment_counts[self.analyzer.get_sentiment(score)] += sign
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def append_lines(self, lines):
+        """
+        Appends lines to the end of the document, scoring only the new lines.
+        """
+        lines = list(lines)
+        new_scores = self._score_lines(lines)
+        self.lines.extend(lines)
+        self.line_scores.extend(new_scores)
+        self.line_totals.extend(math.fsum(scores) for scores in new_scores)
+        self._add_scores(new_scores, 1)
+        for scores in new_scores: # the moving average just moves forward
+            for score in scores:
+                self.average.update(score)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def replace_lines(self, start, end, lines):
+        """
+        Replaces lines[start:end] with the given lines (like a slice assignment, so an empty
+        list deletes and start == end inserts), scoring only the new lines.
+        """
+        start, end, _ = slice(start, end).indices(len(self.lines))
+        end = max(start, end)
+        lines = list(lines)
+        new_scores = self._score_lines(lines)
+        self._add_scores(self.line_scores[start:end], -1)
+        self.lines[start:end] = lines
+        self.line_scores[start:end] = new_scores
+        self.line_totals[start:end] = [math.fsum(scores) for scores in new_scores]
+        self._add_scores(new_scores, 1)
+        self._rebuild_average()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def delete_lines(self, start, end):
+        """
+        Removes lines[start:end] from the document.
+        """
+        self.replace_lines(start, end, [])
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _rebuild_average(self):
+        """
+        Rebuilds the moving average from the last window_size sentence scores, walking back
+        from the end of the document only as far as needed.
+        """
+        tail = []
+        for scores in reversed(self.line_scores):
+            tail.extend(reversed(scores))
+            if len(tail) >= self.window_size:
+                break
+        self.average = MovingAverage(self.window_size)
+        for score in reversed(tail[:self.window_size]):
+            self.average.update(score)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def moving_average(self):
+        """
+        Returns the moving average of the last window_size sentence scores, or None if the
+        document has fewer sentences than the window.
+        """
+        return self.average.value()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    @property
+    def total_score(self):
+        """
+        Sum of every sentence score, computed with math.fsum over the line sums after an edit
+        and cached until the next one.
+        """
+        if self._total_score is None:
+            self._total_score = math.fsum(self.line_totals)
+        return self._total_score
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def overall_sentiment(self):
+        """
+        Returns the overall sentiment and score in the same form as analyze_sentiment.
+        """
+        score = self.total_score / self.sentence_count if self.sentence_count > 0 else 0
+        return {'overall_sentiment': self.analyzer.get_sentiment(score), 'score': score}
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def summary(self):
+        """
+        Returns the overall sentiment and sentiment counts, like analyze_sentiment in 'summary' format.
+        """
+        return {'overall_sentiment': self.overall_sentiment(), 'sentiment_counts': dict(self.sentiment_counts)}
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def scores(self):
+        """
+        Returns every sentence score of the document in order.
+        """
+        return [score for scores in self.line_scores for score in scores]
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __len__(self):
+        """
+        Returns the number of lines in the document.
+        """
+        return len(self.lines)
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def main():
+    """
+    Checks a session against full re-analysis. A seeded sequence of 300 random appends,
+    replacements, insertions and deletions is applied to both a DocumentSession and a plain
+    list of lines, and after every edit the session's summary, sentence scores and moving
+    average must equal analyzing the whole list from scratch. It is run again with
+    multipliers of 1.3 and 0.7, which are not exact in binary, where the overall score must
+    stay the exact sum of the current scores.
+    """
+    import random
+    from synthetic_books import generate_book
+    from sentiment_analyzer import SentimentAnalyzer
+    from smoothing import simple_moving_average
+
+    # analyzer whose scores are not exact binary fractions, so running sums would drift
+    class InexactAnalyzer(SentimentAnalyzer):
+        INTENSIFIER_MULTIPLIER = 1.3
+        DOWNTONER_MULTIPLIER = 0.7
+
+    source = generate_book(chapters=10, lines_per_chapter=30, seed=1)
+    window_size = 7
+
+    for analyzer in (SentimentAnalyzer(tokenizer='regex'), InexactAnalyzer(tokenizer='regex')):
+        name = type(analyzer).__name__
+        rng = random.Random(0)
+        document = source[:100]
+        session = DocumentSession(analyzer, document, True, True, window_size)
+        for step in range(300):
+            new_lines = source[rng.randrange(len(source)):][:rng.randint(0, 5)]
+            if rng.random() < 0.3: # append
+                document = document + new_lines
+                session.append_lines(new_lines)
+            else: # replace, insert (start == end) or delete (no new lines)
+                start = rng.randrange(len(document) + 1)
+                end = start + rng.randint(0, 4)
+                document = document[:start] + new_lines + document[end:]
+                session.replace_lines(start, end, new_lines)
+
+            assert session.lines == document, f"Failed on lines after step {step} with {name}"
+            summary = analyzer.analyze_sentiment(document, True, True, 'summary')
+            assert session.sentiment_counts == summary['sentiment_counts'], f"Failed on counts after step {step} with {name}"
+            scores = [score for _, score, _, _, _ in analyzer.iter_sentence_scores(document, True, True)]
+            assert session.scores() == scores, f"Failed on sentence scores after step {step} with {name}"
+            assert session.total_score == math.fsum(scores), f"Failed on total score after step {step} with {name}"
+            if name == 'SentimentAnalyzer': # scores are exact, so plain summing agrees too
+                assert session.summary() == summary, f"Failed on summary after step {step}"
+            expected = simple_moving_average(scores, window_size)[-1] if len(scores) >= window_size else None
+            actual = session.moving_average()
+            assert (actual is None) == (expected is None), f"Failed on moving average warm-up after step {step} with {name}"
+            assert actual is None or abs(actual - expected) < 1e-9, f"Failed on moving average after step {step} with {name}"
+
+    print("All document session tests passed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+# exporters.py
+# Alekya Veluri
+#
+# Streaming writers for per-sentence results. Rows are buffered and written in bulk to CSV,
+# JSON Lines or a compact binary columnar format, optionally compressed with gzip, bz2 or xz from
+# the standard library, so whole corpora can be exported without holding them in memory.
+
+# import necessary libraries
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import struct
+import sys
+from array import array
+
+from sentiment_results import SentimentResults, LABELS
+
+# openers for each supported compression
+COMPRESSIONS = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+
+# file extension of each compression, used when compression is not given
+EXTENSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+
+# label code of each label string
+LABEL_CODES = {label: code for code, label in LABELS.items()}
+
+# header of the binary columnar format
+COLUMNAR_MAGIC = b"SENTCOL1"
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def open_output(path, binary=False, compression=None):
+    """
+    Opens path for writing, compressed with 'gzip', 'bz2' or 'xz' if requested or if the path
+    ends with .gz, .bz2 or .xz. compression='none' disables compression.
+    """
+    if compression is None:
+        compression = next((name for extension, name in EXTENSIONS.items() if str(path).endswith(extension)), 'none')
+    if compression == 'none':
+        return open(path, "wb") if binary else open(path, "w", newline="", encoding="utf-8")
+    try:
+        opener = COMPRESSIONS[compression]
+    except KeyError:
+        raise ValueError(f"Unknown compression '{compression}', expected one of {sorted(COMPRESSIONS)} or 'none'")
+    return opener(path, "wb") if binary else opener(path, "wt", newline="", encoding="utf-8")
+
+
+class ResultWriter:
+    """
+    Base class of the streaming writers. Rows of (book, sentiment, score, sentence) are
+    collected in a buffer and written in bulk every buffer_rows rows, on flush() and on close().
+    Scores are always written as floats, the type the columnar results store them in.
+    """
+
+    binary = False
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __init__(self, path, compression=None, buffer_rows=10000):
+        """
+        Opens the output file, see open_output for the compression options.
+        """
+        self.path = path
+        self.buffer_rows = buffer_rows
+        self.rows_written = 0
+        self._buffer = []
+        self._file = open_output(path, self.binary, compression)
+        self._start()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _start(self):
+        """
+        Writes anything that comes before the first row.
+        """
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _write_rows(self, rows):
+        """
+        Writes a list of buffered rows to the file.
+        """
+        raise NotImplementedError
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    @property
+    def rows_pending(self):
+        """
+        Number of rows buffered but not written yet.
+        """
+        return len(self._buffer)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def write(self, book, sentiment, score, sentence):
+        """
+        Adds one row to the buffer.
+        """
+        self._buffer.append((book, sentiment, float(score), sentence))
+        if len(self._buffer) >= self.buffer_rows:
+            self.flush()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def write_results(self, book, results):
+        """
+        Adds the rows of one book. results can be a SentimentResults object, a dict returned by
+        analyze_sentiment, a list of detailed result dicts or any iterable of
+        (sentiment, score, sentence) tuples, which is consumed as a stream.
+        """
+        if isinstance(results, SentimentResults):
+            rows = ((LABELS[results.labels[i]], results.scores[i], results.sentence(i)) for i in range(len(results)))
+        else:
+            if isinstance(results, dict):
+                results = results['detailed_results']
+            rows = ((row['sentiment'], row['score'], row['sentence']) if isinstance(row, dict) else row for row in results)
+        for sentiment, score, sentence in rows:
+            self.write(book, sentiment, score, sentence)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def flush(self):
+        """
+        Writes the buffered rows.
+        """
+        if self._buffer:
+            self._write_rows(self._buffer)
+            self.rows_written += len(self._buffer)
+            self._buffer = []
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def close(self):
+        """
+        Writes the buffered rows and closes the file.
+        """
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class CSVResultWriter(ResultWriter):
+    """
+    Writes rows as CSV with a Book, Sentiment, Score, Sentence header.
+    """
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _start(self):
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(['Book', 'Sentiment', 'Score', 'Sentence'])
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _write_rows(self, rows):
+        self._writer.writerows(rows)
+
+
+class JSONLResultWriter(ResultWriter):
+    """
+    Writes one JSON object per line with book, sentiment, score and sentence keys.
+    """
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _write_rows(self, rows):
+        dumps = json.dumps
+        self._file.write("".join(dumps({'book': book, 'sentiment': sentiment, 'score': score, 'sentence': sentence},
+                                       ensure_ascii=False) + "\n"
+                                 for book, sentiment, score, sentence in rows))
+
+
+class ColumnarResultWriter(ResultWriter):
+    """
+    Writes rows in a compact binary columnar format. After an 8 byte magic header the file
+    is a sequence of blocks, one per flush. Each block holds, little-endian: the row count and
+    the number of new book names (two uint32), the new book names (uint32 length + UTF-8 each),
+    then the columns: book ids (uint32), scores (float64), label codes (int8), sentence byte
+    lengths (uint32) and the concatenated UTF-8 sentences. Book ids number the book names in
+    order of first appearance across the whole file. Use read_columnar to read it back.
+    """
+
+    binary = True
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _start(self):
+        self._book_ids = {} # book name -> id
+        self._file.write(COLUMNAR_MAGIC)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _write_rows(self, rows):
+        new_books = []
+        book_ids = array('I')
+        scores = array('d')
+        labels = array('b')
+        lengths = array('I')
+        sentences = []
+        for book, sentiment, score, sentence in rows:
+            book_id = self._book_ids.get(book)
+            if book_id is None: # first row of a book, its name goes in this block
+                book_id = self._book_ids[book] = len(self._book_ids)
+                new_books.append(str(book).encode('utf-8'))
+            encoded = sentence.encode('utf-8')
+            book_ids.append(book_id)
+            scores.append(score)
+            labels.append(LABEL_CODES[sentiment])
+            lengths.append(len(encoded))
+            sentences.append(encoded)
+        self._write_block(len(rows), new_books, book_ids, scores, labels, lengths, sentences)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def write_results(self, book, results):
+        """
+        Adds the rows of one book, copying the arrays of a SentimentResults object directly.
+        """
+        if not isinstance(results, SentimentResults):
+            return super().write_results(book, results)
+
+        self.flush() # keep rows in order
+        count = len(results)
+        if count == 0:
+            return
+        new_books = []
+        book_id = self._book_ids.get(book)
+        if book_id is None:
+            book_id = self._book_ids[book] = len(self._book_ids)
+            new_books.append(str(book).encode('utf-8'))
+        sentences = [results.sentence(i).encode('utf-8') for i in range(count)]
+        lengths = array('I', map(len, sentences))
+        self._write_block(count, new_books, array('I', [book_id]) * count, results.scores, results.labels, lengths, sentences)
+        self.rows_written += count
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _write_block(self, count, new_books, book_ids, scores, labels, lengths, sentences):
+        """
+        Writes one block of columns.
+        """
+        parts = [struct.pack("<II", count, len(new_books))]
+        for name in new_books:
+            parts.append(struct.pack("<I", len(name)))
+            parts.append(name)
+        for column in (book_ids, scores, labels, lengths):
+            parts.append(_little_endian(column).tobytes())
+        parts.extend(sentences)
+        self._file.write(b"".join(parts))
+
+
+# writer class for each format name
+WRITERS = {'csv': CSVResultWriter, 'jsonl': JSONLResultWriter, 'columnar': ColumnarResultWriter}
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def open_writer(path, format=None, compression=None, buffer_rows=10000):
+    """
+    Opens a result writer, choosing the format from the path (.csv, .jsonl or .col, before
+    any compression extension) unless format is given.
+    """
+    if format is None:
+        name = str(path)
+        for extension in EXTENSIONS:
+            if name.endswith(extension):
+                name = name[:-len(extension)]
+        format = {'.csv': 'csv', '.jsonl': 'jsonl', '.col': 'columnar'}.get(name[name.rfind('.'):], 'csv')
+    try:
+        writer_class = WRITERS[format]
+    except KeyError:
+        raise ValueError(f"Unknown format '{format}', expected one of {sorted(WRITERS)}")
+    return writer_class(path, compression, buffer_rows)
+
+#``````````````````````````````````````````````````````````````````````````````````
+def read_columnar(path, compression=None):
+    """
+    Yields (book, sentiment, score, sentence) rows from a file written by ColumnarResultWriter,
+    reading one block at a time.
+    """
+    if compression is None:
+        compression = next((name for extension, name in EXTENSIONS.items() if str(path).endswith(extension)), 'none')
+    opener = open if compression == 'none' else COMPRESSIONS[compression]
+    with opener(path, "rb") as file:
+        if file.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a columnar results file")
+        books = []
+        while True:
+            header = file.read(8)
+            if not header:
+                return
+            count, new_book_count = struct.unpack("<II", header)
+            for _ in range(new_book_count):
+                (length,) = struct.unpack("<I", file.read(4))
+                books.append(file.read(length).decode('utf-8'))
+            book_ids = _read_column(file, 'I', count)
+            scores = _read_column(file, 'd', count)
+            labels = _read_column(file, 'b', count)
+            lengths = _read_column(file, 'I', count)
+            text = file.read(sum(lengths))
+            position = 0
+            for i in range(count):
+                sentence = text[position:position + lengths[i]].decode('utf-8')
+                position += lengths[i]
+                yield books[book_ids[i]], LABELS[labels[i]], scores[i], sentence
+
+#``````````````````````````````````````````````````````````````````````````````````
+def export_lines(analyzer, lines, writer, book="", use_negation=False, use_modifiers=False):
+    """
+    Scores lines of text and streams one row per sentence into writer as each batch is
+    scored, without building the detailed results. Returns the number of rows written.
+    """
+    count = 0
+    get_sentiment = analyzer.get_sentiment
+    for sentence, score, _, _, _ in analyzer.iter_sentence_scores(lines, use_negation, use_modifiers):
+        writer.write(book, get_sentiment(score), score, sentence)
+        count += 1
+    return count
+
+#``````````````````````````````````````````````````````````````````````````````````
+def export_corpus(analyzer, file_paths, writer, use_negation=False, use_modifiers=False, workers=None, book_names=None):
+    """
+    Scores every text file in a process pool and streams the per-sentence rows of all of them
+    into one writer, in input order. Each worker reads its own files, so a book only travels
+    between processes once, with its results, and only the books being scored or waiting to be
+    written are held in memory. book_names defaults to the file paths and must have one name
+    per file. Returns the number of rows written.
+    """
+    file_paths = list(file_paths)
+    book_names = list(book_names) if book_names is not None else file_paths
+    if len(book_names) != len(file_paths):
+        raise ValueError(f"Got {len(book_names)} book names for {len(file_paths)} files")
+
+    before = writer.rows_written + writer.rows_pending
+    results = analyzer.iter_analyze_corpus(file_paths, use_negation, use_modifiers, workers, result_format='columnar')
+    for book, book_results in zip(book_names, results):
+        writer.write_results(book, book_results)
+    writer.flush()
+    return writer.rows_written - before
+
+#``````````````````````````````````````````````````````````````````````````````````
+def _little_endian(column):
+    """
+    Returns the array in little-endian byte order (a byte swapped copy on big-endian machines).
+    """
+    if sys.byteorder == 'little' or column.itemsize == 1:
+        return column
+    swapped = array(column.typecode, column)
+    swapped.byteswap()
+    return swapped
+
+#``````````````````````````````````````````````````````````````````````````````````
+def _read_column(file, typecode, count):
+    """
+    Reads count little-endian values of the given array typecode.
+    """
+    column = array(typecode)
+    column.frombytes(file.read(column.itemsize * count))
+    if sys.byteorder != 'little' and column.itemsize > 1:
+        column.byteswap()
+    return column
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def main():
+    """
+    Round-trips the rows of a few synthetic books through the csv, jsonl.gz and col formats,
+    written both by export_lines and by export_corpus, and checks that every row read back
+    equals the detailed results of analyze_sentiment. A small buffer makes each export flush
+    many times, and export_corpus is run serially and in a process pool.
+    """
+    import os
+    import tempfile
+    from sentiment_analyzer import SentimentAnalyzer
+    from synthetic_books import generate_book
+
+    analyzer = SentimentAnalyzer(tokenizer='regex')
+    books = {f"book {number}": generate_book(chapters=3, lines_per_chapter=20, seed=number) for number in range(3)}
+    expected = [(name, row['sentiment'], float(row['score']), row['sentence'])
+                for name, lines in books.items() for row in analyzer.analyze_sentiment(lines, True, True)['detailed_results']]
+
+    # reader of each format, yielding (book, sentiment, score, sentence) rows
+    def read_csv(path):
+        with open(path, newline="", encoding="utf-8") as file:
+            rows = csv.reader(file)
+            assert next(rows) == ['Book', 'Sentiment', 'Score', 'Sentence'], "Failed on the csv header"
+            return [(book, sentiment, float(score), sentence) for book, sentiment, score, sentence in rows]
+
+    def read_jsonl(path):
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            return [(row['book'], row['sentiment'], row['score'], row['sentence']) for row in map(json.loads, file)]
+
+    readers = {'rows.csv': read_csv, 'rows.jsonl.gz': read_jsonl, 'rows.col': lambda path: list(read_columnar(path))}
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for name, lines in books.items():
+            paths.append(os.path.join(directory, name + ".txt"))
+            with open(paths[-1], "w", encoding="utf-8") as file:
+                file.writelines(lines)
+
+        for file_name, read in readers.items():
+            path = os.path.join(directory, file_name)
+            with open_writer(path, buffer_rows=50) as writer:
+                count = sum(export_lines(analyzer, lines, writer, name, True, True) for name, lines in books.items())
+            assert count == len(expected) and read(path) == expected, f"Failed on export_lines to {file_name}"
+
+            for workers in (1, 2):
+                with open_writer(path, buffer_rows=50) as writer:
+                    writer.write("before", "neutral", 0, "A row buffered before the export.")
+                    count = export_corpus(analyzer, paths, writer, True, True, workers, book_names=list(books))
+                    assert writer.rows_pending == 0, f"Failed on flushing export_corpus to {file_name}"
+                assert count == len(expected), f"Failed on the row count of export_corpus to {file_name}"
+                assert read(path)[1:] == expected, f"Failed on export_corpus to {file_name} with {workers} workers"
+
+        try:
+            export_corpus(analyzer, paths, None, book_names=["only one name"])
+            raise AssertionError("Failed on rejecting a book_names list of the wrong length")
+        except ValueError:
+            pass
+    print("All exporter tests passed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,13 @@
 # 
 # Takes a text as input, extracts lines and chapters and computes sentiment score using SentimentAnalyzer. Calculates moving average and plots results.
 
-# import necessary libraries and Sentiment Analyzer
+# import necessary libraries and Sentiment Analyzer, matplotlib and numpy are imported on first use
+import argparse
+import os
 import sys
 import csv
-from sentiment_analyzer import SentimentAnalyzer
-import matplotlib.pyplot as plt
+from collections import deque
+from sentiment_analyzer import SentimentAnalyzer, ensure_resources
 
 #``````````````````````````````````````````````````````````````````````````````````
 # words for analysis  
@@ -45,6 +47,13 @@ starter_downtoners = [
     "less", "little", "marginally", "rarely", "scarcely", "sparsely"
 ]
 
+# books analyzed when main is run without file arguments
+default_books = ['Pride and Prejudice.txt', 'Little Women.txt', 'Sense and Sensibility.txt']
+
+# markers around the body of a Project Gutenberg text
+gutenberg_start_phrase = "*** START OF THE PROJECT GUTENBERG EBOOK"
+gutenberg_end_phrase = "*** END OF THE PROJECT GUTENBERG EBOOK"
+
 
 #``````````````````````````````````````````````````````````````````````````````````
 # function which extracts lines from text and returns list of lines
@@ -113,85 +122,278 @@ def create_fake_chapters(lines, lines_per_chapter):
         chapter_count += 1 # increment chapter count
     return chapters # dictionary with chapter titles as keys and lists of lines as values
 
+#``````````````````````````````````````````````````````````````````````````````````
+# generator which finds the Gutenberg markers, chapter headings and fake chapter windows in one pass
+
+def iter_chapters(lines, lines_per_chapter=None, gutenberg_chapters=True, epilogue="Epilogue", counts=None):
+    """
+    Reads lines lazily and yields (chapter_title, chapter_lines, fake) as soon as each chapter
+    is complete. Gutenberg chapters start at lines beginning with "CHAPTER" (or equal to the
+    epilogue) as in extract_chapters_from_gutenberg_lines. If lines_per_chapter is given, fake
+    chapters of that many body lines are yielded in the same pass, titled as in
+    create_fake_chapters. Only the chapters in progress are held in memory. A repeated
+    heading yields a second chapter rather than replacing the first, and a body without an
+    END marker is still yielded. If counts is a dict, counts['body_lines'] is kept up to date
+    with the number of body lines read (the lines between every START and END marker).
+    """
+    in_body = False
+    in_chapter = False
+    current_chapter = ""
+    chapter_lines = [] # lines of the Gutenberg chapter in progress
+    fake_lines = [] # lines of the fake chapter in progress
+    fake_count = 1
+    body_lines = 0
+
+    for line in lines:
+        stripped = line.strip()
+
+        # body markers, the end marker closes any chapters in progress
+        if stripped.startswith(gutenberg_start_phrase):
+            in_body = True
+            continue
+        if stripped.startswith(gutenberg_end_phrase):
+            if gutenberg_chapters and in_chapter and current_chapter:
+                yield current_chapter, chapter_lines, False
+            if fake_lines:
+                yield f"Chapter {fake_count}", fake_lines, True
+            in_body = in_chapter = False
+            current_chapter = ""
+            chapter_lines = []
+            fake_lines = []
+            fake_count = 1 # numbering restarts for the next book in an archive
+            continue
+        if not in_body:
+            continue
+        if counts is not None:
+            body_lines += 1
+            counts['body_lines'] = body_lines
+
+        # fake chapters are fixed windows over every body line
+        if lines_per_chapter:
+            fake_lines.append(line)
+            if len(fake_lines) == lines_per_chapter:
+                yield f"Chapter {fake_count}", fake_lines, True
+                fake_lines = []
+                fake_count += 1
+
+        # Gutenberg chapters start at each heading
+        if gutenberg_chapters:
+            if stripped.startswith("CHAPTER") or stripped == epilogue:
+                if in_chapter and current_chapter:
+                    yield current_chapter, chapter_lines, False
+                    chapter_lines = []
+                current_chapter = stripped
+                in_chapter = True
+            elif in_chapter:
+                chapter_lines.append(line)
+
+    # text ended without an END marker, yield what is left
+    if gutenberg_chapters and in_chapter and current_chapter:
+        yield current_chapter, chapter_lines, False
+    if fake_lines:
+        yield f"Chapter {fake_count}", fake_lines, True
+
+#``````````````````````````````````````````````````````````````````````````````````
+# generator which scores chapters as they stream out of a file
+
+def stream_chapter_scores(lines, analyzer, use_negation=True, use_modifiers=True, lines_per_chapter=None,
+                          gutenberg_chapters=True, epilogue="Epilogue", workers=1, estimate=False, keep_scores=False,
+                          counts=None):
+    """
+    Yields (chapter_title, score_summary) for every chapter found by iter_chapters, in order,
+    as soon as it has been scored. score_summary holds 'overall_sentiment', 'sentiment_counts'
+    and 'fake' (True for fixed-size windows). With workers other than 1 the chapters are
+    scored in a process pool while the file is still being read. With estimate=True each
+    chapter score is estimated from a sample of its lines and score_summary also holds the
+    'estimate' confidence interval (see SentimentAnalyzer.estimate_sentiment). With
+    keep_scores=True score_summary also holds 'scores', the list of sentence scores. counts
+    is passed to iter_chapters and holds the body line count once all chapters are yielded.
+    """
+    titles = deque() # titles of chapters handed to the analyzer, in order
+
+    def documents():
+        for title, chapter_lines, fake in iter_chapters(lines, lines_per_chapter, gutenberg_chapters, epilogue, counts):
+            titles.append((title, fake))
+            yield chapter_lines
+
+    result_format = 'estimate' if estimate else 'columnar' if keep_scores else 'summary'
+    for result in analyzer.iter_analyze_many(documents(), use_negation, use_modifiers, workers, result_format=result_format):
+        title, fake = titles.popleft()
+        summary = {'overall_sentiment': result['overall_sentiment'],
+                   'sentiment_counts': result['sentiment_counts'], 'fake': fake}
+        if estimate:
+            summary['estimate'] = result['estimate']
+        elif keep_scores:
+            summary['scores'] = result.scores.tolist()
+        yield title, summary
+
+#``````````````````````````````````````````````````````````````````````````````````
+# function which draws two sets of scores onto a matplotlib axes
+
+def draw_dual_sentiment(axes, results1, results2, label1='First Analysis', label2='Second Analysis', title="Title"):
+    """Draw both score series, title, labels, legend and grid onto axes."""
+    # 'results1' and 'results2' are the lists of numeric scores to plot
+    axes.plot(results1, marker='o', linestyle='-', color='blue', label=label1) # first analysis
+    axes.plot(results2, marker='o', linestyle='-', color='green', label=label2) # second analysis
+
+    axes.set_title(f'Sentiment Trend Comparison\n{title}') # create plot title, have overall title and additional title
+    axes.set_xlabel('Chapter Index') # x axis
+    axes.set_ylabel('Sentiment Score') # y axis
+    axes.legend() # show legend
+    axes.grid(True) # show grid
+
 #``````````````````````````````````````````````````````````````````````````````````
 # function will plot sentiment for two sets of scores.
 
 def plot_dual_sentiment(results1, results2, label1='First Analysis', label2='Second Analysis', xlabel="Sentence Index", title="Title"):
+    import matplotlib.pyplot as plt # only runs that plot pay for matplotlib
     plt.figure(figsize=(10, 6))
-    
-    # 'results1' and 'results2' are the lists of numeric scores to plot
-    plt.plot(results1, marker='o', linestyle='-', color='blue', label=label1) # first analysis
-    plt.plot(results2, marker='o', linestyle='-', color='green', label=label2) # second analysis
-    
-    plt.title(f'Sentiment Trend Comparison\n{title}') # create plot title, have overall title and additional title
-    plt.xlabel('Chapter Index') # x axis
-    plt.ylabel('Sentiment Score') # y axis
-    plt.legend() # show legend
-    plt.grid(True) # show grid
+    draw_dual_sentiment(plt.gca(), results1, results2, label1, label2, title)
     plt.show() # show graph
 
 
 #``````````````````````````````````````````````````````````````````````````````````
 # function which will compute the moving average of a list of values.
 
-def moving_average(values, window_size=20):
-    """Calculate the moving average of a list of values given a window size."""
-    averages = [] # create empty list for averages
-    for i in range(len(values)): # iterate over the length of the list
-        if i+1 < window_size:
-            # Not enough data points to calculate the average, append None or keep as is
-            averages.append(None)
-        else:
-            # Calculate the moving average
-            averages.append(sum(values[i-window_size+1:i+1]) / window_size)
-    return averages # return list of scores
+def moving_average(values, window_size=20, use_nan=False):
+    """
+    Calculate the moving average of a list of values given a window size. Positions without
+    enough data points are None, or NaN in the returned NumPy array if use_nan is True.
+    The averages are computed with cumulative sums from the smoothing module in O(n).
+    """
+    from smoothing import simple_moving_average # numpy is only loaded when smoothing
+    averages = simple_moving_average(values, window_size) # NaN for the warm-up region
+    if use_nan:
+        return averages
+    warmup = min(window_size - 1, len(averages)) # not enough data points to calculate the average
+    return [None] * warmup + averages[warmup:].tolist() # return list of scores
     
 
+#``````````````````````````````````````````````````````````````````````````````````
+# function which scores the Gutenberg or fake chapters of a book, reusing stored results
+
+def chapter_results(path, analyzer, use_negation=True, use_modifiers=True, lines_per_chapter=None, workers=None,
+                    store=None, content_hash=None, keep_scores=False):
+    """
+    Returns a dict with 'chapters', the (title, summary) pairs of stream_chapter_scores,
+    'metadata' ({'body_lines': n} for Gutenberg chapters) and 'scores' (per-chapter lists of
+    sentence scores if keep_scores, otherwise None). Gutenberg chapters are scored unless
+    lines_per_chapter is given. With a ResultStore the results are looked up by the file's
+    content_hash (computed if not given) first and saved after scoring.
+    """
+    gutenberg_chapters = lines_per_chapter is None
+    if store is not None:
+        from result_store import file_content_hash
+        boundaries = ({'chapters': 'gutenberg', 'epilogue': "Epilogue"} if gutenberg_chapters
+                      else {'chapters': 'fake', 'lines_per_chapter': lines_per_chapter})
+        key = store.make_key(content_hash or file_content_hash(path), boundaries, analyzer.fingerprint,
+                             use_negation, use_modifiers)
+        entry = store.get(key)
+        if entry is not None and (entry['scores'] is not None or not keep_scores):
+            return entry
+
+    # Stream the chapters out of the file and score them in parallel across CPU cores,
+    # only the chapters in progress are held in memory, and count the body lines on the way
+    chapters = []
+    scores = [] if keep_scores else None
+    counts = {'body_lines': 0}
+    with open(path, "r") as file:
+        for title, summary in stream_chapter_scores(file, analyzer, use_negation, use_modifiers, lines_per_chapter,
+                                                    gutenberg_chapters, workers=workers, keep_scores=keep_scores,
+                                                    counts=counts):
+            if keep_scores:
+                scores.append(summary.pop('scores'))
+            chapters.append((title, summary))
+
+    metadata = {'body_lines': counts['body_lines']} if gutenberg_chapters else {}
+    if store is not None:
+        store.put(key, chapters, metadata, scores)
+    return {'chapters': chapters, 'metadata': metadata, 'scores': scores}
+
+#``````````````````````````````````````````````````````````````````````````````````
+# function which scores one book by Gutenberg chapters and by equal sized fake chapters
+
+def analyze_book(path, analyzer, use_negation=True, use_modifiers=True, window_size=20, workers=None, store=None, keep_scores=False):
+    """
+    Scores the Gutenberg chapters of the book at path, then fake chapters with the average
+    number of lines of a Gutenberg chapter. The file is streamed twice: the fake chapter
+    size depends on the chapter and body line counts, which are only known once the first
+    pass (which also counts the body lines) reaches the end of the book. Returns a dict with
+    the title (file name without '.txt'), both lists of chapter scores, lines_per_chapter and
+    the moving averages of both lists. A book without chapter headings has no fake chapters.
+    With a ResultStore, unchanged books are read from the store instead of being scored;
+    keep_scores also returns (and stores) the sentence scores of every chapter.
+    """
+    content_hash = None
+    if store is not None:
+        from result_store import file_content_hash
+        content_hash = file_content_hash(path)
+    gutenberg = chapter_results(path, analyzer, use_negation, use_modifiers, None, workers, store, content_hash, keep_scores)
+    gutresults = [summary['overall_sentiment']['score'] for title, summary in gutenberg['chapters']]
+
+    # integer division to approximate the lines per chapter by looking at the number
+    # of chapters extracted by the gutenberg chapter method
+    lines_per_chapter = gutenberg['metadata']['body_lines'] // len(gutresults) if gutresults else 0
+
+    # Create fake chapters with some number of lines per chapter
+    # and get sentiment results using fake chapters
+    fake = {'chapters': [], 'scores': [] if keep_scores else None}
+    if lines_per_chapter:
+        fake = chapter_results(path, analyzer, use_negation, use_modifiers, lines_per_chapter, workers, store, content_hash, keep_scores)
+    fakeresults = [summary['overall_sentiment']['score'] for title, summary in fake['chapters']]
+
+    return {
+        'title': os.path.basename(path).replace('.txt', ''), # file name without '.txt'
+        'gutenberg_scores': gutresults,
+        'fake_scores': fakeresults,
+        'lines_per_chapter': lines_per_chapter,
+        'gutenberg_average': moving_average(gutresults, window_size),
+        'fake_average': moving_average(fakeresults, window_size),
+        'gutenberg_sentence_scores': gutenberg['scores'],
+        'fake_sentence_scores': fake['scores'],
+    }
+
 #``````````````````````````````````````````````````````````````````````````````````
 # main script for this analyzer
 
-def main():
-    # simulate command line arguments, pass in texts that need to be analyzed
-    sys.argv = ['gbas.py', 'Pride and Prejudice.txt', 'Little Women.txt', 'Sense and Sensibility.txt'] 
-    if len(sys.argv) < 4: # print usage statement
-        print("Usage: python final_project.py <path_to_file1> <path_to_file2> <path_to_file3>")
-        sys.exit(1)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plot the chapter sentiment of Project Gutenberg books.")
+    parser.add_argument("files", nargs="*", default=default_books, help="text files or glob patterns (default: the three sample books)")
+    parser.add_argument("--report", metavar="DIR", help="write PNG/SVG charts and an index.html to DIR instead of showing plots")
+    parser.add_argument("--format", dest="formats", nargs="+", default=["png"], choices=["png", "svg"], help="image formats of the report")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--store", metavar="FILE", help="SQLite result store, unchanged books are not analyzed again")
+    args = parser.parse_args(argv)
+
+    from batch_report import expand_inputs, render_reports, print_summary # matplotlib is only loaded when plotting
+    paths = expand_inputs(args.files)
+    if not paths: # print usage statement
+        parser.print_usage()
+        return 1
 
-    # call sentiment analyzer
+    # call sentiment analyzer, its default nltk tokenizer needs the Punkt data
+    ensure_resources(download=True)
     analyzer = SentimentAnalyzer(starter_positive_words, starter_negative_words, starter_negation_words, starter_intensifiers, starter_downtoners)
-    for i in range(1,4): # go through each text file
-        file = open(sys.argv[i],"r") # open file for reading
-        lines = file.readlines(); # get lines
-        file.close # close file
-        glines = extract_gutenberg_text(lines) # use function to get list of lines and assign variable to this
-
-        # Using the extract_chapters_from_gutenberg method to get chapters
-        # and get sentiment results using the chapters
-        gutlines = extract_chapters_from_gutenberg_lines(glines)
-        gutresults = [analyzer.analyze_sentiment(text, True, True)['overall_sentiment']['score'] for text in gutlines.values()]
-
-        # integer division to approximate the lines per chapter by looking at the number
-        # of chapters extracted by the gutenberg chapter method
-        lines_per_chapter = len(glines) // len(gutresults)
-
-        # Create fake chapters with some number of lines per chapter
-        # and get sentiment results using fake chapters
-        fakelines = create_fake_chapters(glines,lines_per_chapter)
-        fakeresults = [analyzer.analyze_sentiment(text, True, True)['overall_sentiment']['score'] for text in fakelines.values()]
+    store = None
+    if args.store:
+        from result_store import ResultStore
+        store = ResultStore(args.store)
+
+    # headless batch mode, one chart per book rendered across worker processes
+    if args.report:
+        records = render_reports(paths, args.report, analyzer, args.workers, args.formats, store=store)
+        return print_summary(records, args.report)
+
+    for path in paths: # go through each text file
+        book = analyze_book(path, analyzer, workers=args.workers, store=store)
 
         # Create two labels, one for each of the results
         lbl1 = "Chapters from Gutenberg"
-        lbl2 = f"Chapters with {lines_per_chapter} lines per chapter"
-
-        # plot both sentiment values using the same plot window
-        ma1 = moving_average(gutresults)
-        ma2 = moving_average(fakeresults)
+        lbl2 = f"Chapters with {book['lines_per_chapter']} lines per chapter"
 
-        # Create title using text file name and remove '.txt.'
-        title = str(sys.argv[i].replace('.txt', ''))
+        # plot both moving averages using the same plot window
+        plot_dual_sentiment(book['gutenberg_average'], book['fake_average'], lbl1, lbl2, "Chapter Index", book['title'])
+    return 0
 
-        # plot results
-        plot_dual_sentiment(ma1, ma2,lbl1 ,lbl2, "Chapter Index", title)
-        
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
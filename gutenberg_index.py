@@ -0,0 +1,291 @@
+# gutenberg_index.py
+# Alekya Veluri
+#
+# Byte level index of a Project Gutenberg book. The file is memory-mapped and the START/END
+# markers and chapter headings are found by scanning bytes, so chapters can be decoded on demand
+# without building lists of text lines. The index can be saved next to the book and reused.
+
+# import necessary libraries
+import io
+import json
+import mmap
+import os
+import re
+
+# markers around the body of a Project Gutenberg text, as bytes
+START_MARKER = re.compile(rb"^[ \t\r\f\v]*\*\*\* START OF THE PROJECT GUTENBERG EBOOK", re.MULTILINE)
+END_MARKER = re.compile(rb"^[ \t\r\f\v]*\*\*\* END OF THE PROJECT GUTENBERG EBOOK", re.MULTILINE)
+
+# suffix of the saved index file
+INDEX_SUFFIX = ".chapters.json"
+
+# bumped whenever the saved index format or the scanning rules change
+INDEX_VERSION = 1
+
+
+class GutenbergIndex:
+    """
+    Byte offsets of the body and chapters of a Gutenberg book. body_start and body_end delimit
+    the text between the START and END marker lines (as in gbas.extract_gutenberg_text) and
+    chapters is a list of (title, start, end) byte ranges, one per "CHAPTER"/epilogue heading
+    (as in gbas.extract_chapters_from_gutenberg_lines, except that a repeated heading keeps
+    both chapters). Open the index (or use it in a with block) to read chapters from the file.
+    """
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __init__(self, path, size, mtime_ns, body_start, body_end, chapters, epilogue="Epilogue", encoding="utf-8"):
+        """
+        Creates an index from already known offsets, use build or load_or_build instead.
+        """
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.body_start = body_start
+        self.body_end = body_end
+        self.chapters = chapters
+        self.epilogue = epilogue
+        self.encoding = encoding
+        self._file = None
+        self._map = None
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    @classmethod
+    def build(cls, path, epilogue="Epilogue", encoding="utf-8"):
+        """
+        Memory-maps the book at path and scans its bytes for the markers and chapter headings.
+        """
+        stat = os.stat(path)
+        if stat.st_size == 0: # an empty file cannot be mapped
+            return cls(path, 0, stat.st_mtime_ns, 0, 0, [], epilogue, encoding)
+
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            body_start, body_end = _find_body(data)
+            chapters = _find_chapters(data, body_start, body_end, epilogue, encoding)
+        return cls(path, stat.st_size, stat.st_mtime_ns, body_start, body_end, chapters, epilogue, encoding)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    @classmethod
+    def load_or_build(cls, path, epilogue="Epilogue", encoding="utf-8", save=True):
+        """
+        Loads the index saved next to the book if it is still valid for the file (same size,
+        modification time, epilogue and index version), otherwise builds it and, if save is
+        True, saves it for the next run.
+        """
+        index_path = path + INDEX_SUFFIX
+        try:
+            with open(index_path, "r") as file:
+                saved = json.load(file)
+            stat = os.stat(path)
+            if (saved.get('version') == INDEX_VERSION and saved['size'] == stat.st_size
+                    and saved['mtime_ns'] == stat.st_mtime_ns and saved['epilogue'] == epilogue
+                    and saved['encoding'] == encoding):
+                chapters = [tuple(chapter) for chapter in saved['chapters']]
+                return cls(path, saved['size'], saved['mtime_ns'], saved['body_start'], saved['body_end'],
+                           chapters, epilogue, encoding)
+        except (OSError, ValueError, KeyError):
+            pass # missing, unreadable or stale index, build a new one
+
+        index = cls.build(path, epilogue, encoding)
+        if save:
+            index.save(index_path)
+        return index
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def save(self, index_path=None):
+        """
+        Writes the index as JSON, by default next to the book as <book>.chapters.json.
+        """
+        index_path = index_path or self.path + INDEX_SUFFIX
+        data = {'version': INDEX_VERSION, 'size': self.size, 'mtime_ns': self.mtime_ns,
+                'body_start': self.body_start, 'body_end': self.body_end, 'epilogue': self.epilogue,
+                'encoding': self.encoding, 'chapters': [list(chapter) for chapter in self.chapters]}
+        temporary_path = index_path + ".tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(data, file, separators=(',', ':'))
+        os.replace(temporary_path, index_path) # never leave a half written index behind
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def open(self):
+        """
+        Memory-maps the book for reading chapters. Returns the index so it can be chained.
+        """
+        if self._map is None and self.size:
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def close(self):
+        """
+        Unmaps the book. Memoryviews returned by chapter_bytes must be released first.
+        """
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = self._file = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __len__(self):
+        """
+        Returns the number of chapters.
+        """
+        return len(self.chapters)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def titles(self):
+        """
+        Returns the chapter titles in order.
+        """
+        return [title for title, _, _ in self.chapters]
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def body_line_count(self):
+        """
+        Counts the lines between the markers by counting newline bytes, without decoding.
+        """
+        if self.body_end <= self.body_start:
+            return 0
+        self.open()
+        count = self._map[self.body_start:self.body_end].count(b"\n")
+        if self._map[self.body_end - 1:self.body_end] != b"\n": # last line has no newline
+            count += 1
+        return count
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def chapter_bytes(self, number):
+        """
+        Returns the raw bytes of a chapter as a zero-copy memoryview of the mapped file.
+        """
+        _, start, end = self.chapters[number]
+        self.open()
+        return memoryview(self._map)[start:end]
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def chapter_text(self, number):
+        """
+        Decodes one chapter, translating line endings as reading the file in text mode would.
+        """
+        with self.chapter_bytes(number) as raw:
+            text = str(raw, self.encoding)
+        return text.replace("\r\n", "\n").replace("\r", "\n")
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def chapter_lines(self, number):
+        """
+        Decodes one chapter into a list of lines (with line endings), like readlines().
+        """
+        return io.StringIO(self.chapter_text(number)).readlines()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def iter_chapters(self):
+        """
+        Yields (title, lines) for each chapter, decoding one chapter at a time.
+        """
+        for number, (title, _, _) in enumerate(self.chapters):
+            yield title, self.chapter_lines(number)
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def _find_body(data):
+    """
+    Returns the (start, end) byte offsets of the body: after the last START line that comes
+    before the first END line, up to the start of that END line. (0, 0) if a marker is missing.
+    """
+    end_match = END_MARKER.search(data)
+    if end_match is None:
+        return 0, 0
+    body_end = end_match.start()
+
+    start_match = None
+    for start_match in START_MARKER.finditer(data, 0, body_end):
+        pass # keep the last one
+    if start_match is None:
+        return 0, 0
+
+    line_end = data.find(b"\n", start_match.end(), body_end)
+    body_start = body_end if line_end < 0 else line_end + 1
+    return body_start, body_end
+
+#``````````````````````````````````````````````````````````````````````````````````
+def _find_chapters(data, body_start, body_end, epilogue, encoding):
+    """
+    Returns the (title, start, end) byte ranges of the chapters between body_start and body_end.
+    A heading is a line starting with "CHAPTER" or equal to the epilogue (ignoring surrounding
+    whitespace), and a chapter runs from the line after its heading to the next heading.
+    """
+    heading = re.compile(rb"^[ \t\r\f\v]*(?:CHAPTER[^\n]*|" + re.escape(epilogue.encode(encoding)) + rb"[ \t\r\f\v]*)$",
+                         re.MULTILINE)
+    chapters = []
+    title = None
+    start = None
+    for match in heading.finditer(data, body_start, body_end):
+        if title is not None: # close the previous chapter at this heading
+            chapters.append((title, start, match.start()))
+        title = match.group().decode(encoding).strip()
+        line_end = match.end() + 1 # skip the newline after the heading
+        start = min(line_end, body_end)
+    if title is not None:
+        chapters.append((title, start, body_end))
+    return chapters
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def main():
+    """
+    Builds the index over LF and CRLF copies of a synthetic book and compares it with the
+    line based functions of gbas: the body with extract_gutenberg_text, the chapters with
+    extract_chapters_from_gutenberg_lines and iter_chapters, and the number of fake chapters
+    with create_fake_chapters. Also checks that a saved index is reused only while valid.
+    """
+    import tempfile
+    import gbas # imported here, only the checks need the analyzer
+    from synthetic_books import generate_book
+
+    book = "".join(generate_book(chapters=15, lines_per_chapter=40, seed=3))
+    with tempfile.TemporaryDirectory() as directory:
+        for name, newline in (("lf", "\n"), ("crlf", "\r\n")):
+            path = os.path.join(directory, f"book_{name}.txt")
+            with open(path, "w", newline=newline) as file:
+                file.write(book)
+            with open(path, "r") as file: # text mode reads both copies as LF lines
+                lines = file.readlines()
+            body = gbas.extract_gutenberg_text(lines)
+            chapters = gbas.extract_chapters_from_gutenberg_lines(body)
+
+            with GutenbergIndex.build(path) as index:
+                assert index.body_line_count() == len(body), f"Failed on body line count of the {name} book"
+                assert index.titles() == list(chapters), f"Failed on chapter titles of the {name} book"
+                for number, title in enumerate(index.titles()):
+                    assert index.chapter_lines(number) == chapters[title], f"Failed on lines of {title} in the {name} book"
+                streamed = [(title, chapter_lines) for title, chapter_lines, _ in gbas.iter_chapters(lines)]
+                assert list(index.iter_chapters()) == streamed, f"Failed on iter_chapters of the {name} book"
+                for lines_per_chapter in (1, 7, 100):
+                    fake = gbas.create_fake_chapters(body, lines_per_chapter)
+                    assert len(fake) == -(-index.body_line_count() // lines_per_chapter), \
+                        f"Failed on fake chapter count of the {name} book"
+
+            # a saved index is reused, and rebuilt once the book changes
+            saved = GutenbergIndex.load_or_build(path)
+            assert os.path.exists(path + INDEX_SUFFIX), f"Failed on saving the index of the {name} book"
+            assert GutenbergIndex.load_or_build(path).chapters == saved.chapters, f"Failed on reloading the {name} book"
+            with open(path, "a", newline=newline) as file:
+                file.write("Trailing line.\n")
+            assert GutenbergIndex.load_or_build(path).size == os.stat(path).st_size, f"Failed on rebuilding the {name} book"
+
+        # a book without markers has an empty body, as in extract_gutenberg_text
+        path = os.path.join(directory, "no_markers.txt")
+        with open(path, "w") as file:
+            file.write("CHAPTER 1.\nNo markers here.\n")
+        index = GutenbergIndex.build(path)
+        assert index.body_line_count() == 0 and len(index) == 0, "Failed on a book without markers"
+    print("All gutenberg index tests passed!")
+
+
+if __name__ == "__main__":
+    main()
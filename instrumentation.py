@@ -0,0 +1,156 @@
+# instrumentation.py
+# Alekya Veluri
+#
+# Opt-in timing and counters for SentimentAnalyzer. Records cumulative time per stage of the
+# hot path and counts of sentences, tokens and lexicon hits, exported as a dict or JSON.
+
+# import necessary libraries
+import json
+import time
+from contextlib import contextmanager
+from lexicon import POSITIVE, NEGATIVE, NEGATION, INTENSIFIER, DOWNTONER
+
+# stages timed by the analyzer
+STAGES = ('sentence_tokenize', 'word_tokenize', 'lexicon_lookup', 'scoring', 'result_building')
+
+# counter name for each lexicon category
+CATEGORY_COUNTERS = (
+    (POSITIVE, 'positive_hits'), (NEGATIVE, 'negative_hits'), (NEGATION, 'negation_hits'),
+    (INTENSIFIER, 'intensifier_hits'), (DOWNTONER, 'downtoner_hits'),
+)
+
+
+class Instrumentation:
+    """
+    Cumulative per-stage timings (in seconds) and counters collected while an analyzer is
+    instrumented. If sample_callback is given it is called with a snapshot (see to_dict) every
+    sample_every sentences, so a job runner can log progress while a long book is scored.
+    """
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __init__(self, sample_callback=None, sample_every=1000):
+        """
+        Creates empty timings and counters.
+        """
+        self.sample_callback = sample_callback
+        self.sample_every = sample_every
+        self.reset()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def reset(self):
+        """
+        Sets every timing and counter back to zero.
+        """
+        self.timings = dict.fromkeys(STAGES, 0.0)
+        self.counters = {'sentences': 0, 'tokens': 0, 'negations_applied': 0, 'modifiers_applied': 0}
+        for _, name in CATEGORY_COUNTERS:
+            self.counters[name] = 0
+        self._next_sample = self.sample_every
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def add_time(self, stage, seconds):
+        """
+        Adds seconds to the cumulative time of a stage.
+        """
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    @contextmanager
+    def stage(self, name):
+        """
+        Context manager which adds the time spent in its block to the named stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def count(self, name, amount=1):
+        """
+        Adds amount to a counter.
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def count_sentences(self, amount=1):
+        """
+        Adds scored sentences and calls the sample callback each time the count reaches a
+        multiple of sample_every. A batch which crosses several multiples gives one sample
+        per multiple, each with the sentence count set to that multiple.
+        """
+        if self.sample_callback is not None:
+            while self.counters['sentences'] + amount >= self._next_sample:
+                amount -= self._next_sample - self.counters['sentences']
+                self.counters['sentences'] = self._next_sample
+                self._next_sample += self.sample_every
+                self.sample_callback(self.to_dict())
+        self.counters['sentences'] += amount
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def count_categories(self, categories, use_negation, use_modifiers):
+        """
+        Counts the tokens of one sentence by lexicon category, plus the negations and modifiers
+        that take effect with the given flags (using the same priority as the scorer).
+        """
+        self.counters['tokens'] += len(categories)
+        for category in categories:
+            if not category:
+                continue
+            for flag, name in CATEGORY_COUNTERS:
+                if category & flag:
+                    self.counters[name] += 1
+            if use_negation and category & NEGATION:
+                self.counters['negations_applied'] += 1
+            elif use_modifiers and category & (INTENSIFIER | DOWNTONER):
+                self.counters['modifiers_applied'] += 1
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def to_dict(self):
+        """
+        Returns a snapshot of the timings and counters, plus the total instrumented time.
+        """
+        return {'timings': dict(self.timings), 'counters': dict(self.counters),
+                'total_seconds': sum(self.timings.values())}
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def to_json(self, **kwargs):
+        """
+        Returns the snapshot of to_dict as a JSON string.
+        """
+        return json.dumps(self.to_dict(), **kwargs)
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def main():
+    """
+    Checks that samples are taken at every multiple of sample_every when sentences are counted
+    in batches, and that result building is timed for the dict and columnar formats.
+    """
+    from sentiment_analyzer import SentimentAnalyzer # imported here, it imports this module
+
+    # batches larger than sample_every, and batches that straddle a multiple
+    for amounts in ([4096, 4096, 1808], [7] * 1430, [999, 2, 999, 7000]):
+        samples = []
+        stats = Instrumentation(lambda snapshot: samples.append(snapshot['counters']['sentences']), sample_every=1000)
+        for amount in amounts:
+            stats.count_sentences(amount)
+        assert samples == list(range(1000, sum(amounts) + 1, 1000)), f"Failed on samples of batches {amounts[:4]}"
+        assert stats.counters['sentences'] == sum(amounts), f"Failed on sentence count of batches {amounts[:4]}"
+
+    # the vectorized engine scores sentences in batches of 4096
+    analyzer = SentimentAnalyzer(["good"], ["bad"], ["not"], ["very"], ["slightly"], tokenizer='regex', engine='vectorized')
+    lines = ["It was good. It was not bad. It was very good."] * 3000
+    for result_format in ('dict', 'columnar'):
+        samples = []
+        with analyzer.instrument(lambda snapshot: samples.append(snapshot['counters']['sentences']), sample_every=1000) as stats:
+            analyzer.analyze_sentiment(lines, True, True, result_format)
+        assert samples == list(range(1000, 9001, 1000)), f"Failed on samples with result_format={result_format}"
+        assert stats.timings['result_building'] > 0, f"Failed on result_building time with result_format={result_format}"
+        assert stats.counters['sentences'] == 9000, f"Failed on sentence count with result_format={result_format}"
+    print("All instrumentation tests passed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+# lexicon.py
+# Alekya Veluri
+#
+# Compiles the word lists used by SentimentAnalyzer into a single lowercase token index
+# plus a phrase trie so that every lookup in the scoring loop is a dictionary hit.
+
+# Category flags, a word can belong to more than one list so each entry stores a bitmask
+NEUTRAL = 0
+POSITIVE = 1
+NEGATIVE = 2
+NEGATION = 4
+INTENSIFIER = 8
+DOWNTONER = 16
+
+# bits used by one lexicon's flags inside a MergedLexiconIndex entry
+CATEGORY_BITS = 5
+CATEGORY_MASK = (1 << CATEGORY_BITS) - 1
+
+# import necessary libraries
+import hashlib
+
+from text_tokenizers import entry_tokens
+
+# marker key for the end of a phrase inside the trie (tokens are always strings)
+_PHRASE_END = None
+
+
+class LexiconIndex:
+    """
+    A compiled, lowercase index of the sentiment word lists. Single word entries are stored
+    in a token -> category bitmask dictionary and multi-word entries ("a bit", "a little")
+    are stored in a trie keyed on tokens so they can be matched in a tokenized sentence.
+    Entries are split with the tokenizer that splits the sentences, so an entry the tokenizer
+    breaks into several tokens ("isn't" is "is", "n't" for NLTK) is stored as a phrase too.
+    """
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __init__(self, positive_words=(), negative_words=(), negation_words=(), intensifiers=(), downtoners=(), tokenizer=None):
+        """
+        Builds the word dictionary and phrase trie from the five category lists. Entries are
+        split with the tokenizer backend if given and on whitespace otherwise.
+        """
+        self.tokenizer = tokenizer
+        self.words = {} # token -> category bitmask
+        self.phrases = {} # trie of tokens, the _PHRASE_END key holds the bitmask
+        self.max_phrase_length = 1
+
+        # add every list with its category flag
+        for entries, category in ((positive_words, POSITIVE), (negative_words, NEGATIVE),
+                                  (negation_words, NEGATION), (intensifiers, INTENSIFIER),
+                                  (downtoners, DOWNTONER)):
+            for entry in entries:
+                self.add(entry, category)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def add(self, entry, category):
+        """
+        Adds one lexicon entry to the index. Entries that split into several tokens are stored as phrases.
+        """
+        entry = entry.lower()
+        if self.tokenizer is None:
+            tokens = entry.split() # split phrases on whitespace
+        else:
+            tokens = [token for token in entry_tokens(self.tokenizer, entry) if token.strip()]
+        if not tokens: # ignore empty entries
+            return
+        if len(tokens) == 1:
+            self.words[tokens[0]] = self.words.get(tokens[0], NEUTRAL) | category
+            return
+
+        # walk down the trie, creating nodes as needed
+        node = self.phrases
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node[_PHRASE_END] = node.get(_PHRASE_END, NEUTRAL) | category
+        self.max_phrase_length = max(self.max_phrase_length, len(tokens))
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def lookup(self, word):
+        """
+        Returns the category bitmask of a single (already lowercase) token.
+        """
+        return self.words.get(word, NEUTRAL)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def categorize(self, words):
+        """
+        Converts a list of tokens into a list of category bitmasks, one per lexical unit.
+        Phrases are matched greedily (longest match first) and collapse into a single unit.
+        """
+        words = [word.lower() for word in words] # make words lowercase
+        lookup = self.words.get
+        phrases = self.phrases
+
+        # fast path, no phrases compiled
+        if not phrases:
+            return [lookup(word, NEUTRAL) for word in words]
+
+        categories = []
+        i = 0
+        count = len(words)
+        while i < count:
+            word = words[i]
+            node = phrases.get(word)
+            if node is not None: # a phrase may start here, look for the longest match
+                match_length = 0
+                match_category = NEUTRAL
+                j = i + 1
+                while node is not None:
+                    if _PHRASE_END in node:
+                        match_length = j - i
+                        match_category = node[_PHRASE_END]
+                    if j >= count:
+                        break
+                    node = node.get(words[j])
+                    j += 1
+                if match_length:
+                    categories.append(match_category)
+                    i += match_length
+                    continue
+            categories.append(lookup(word, NEUTRAL))
+            i += 1
+        return categories
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def fingerprint(self):
+        """
+        Returns a hex digest identifying the contents of the index, independent of the order
+        the entries were added in. Two indexes with the same fingerprint score identically.
+        """
+        digest = hashlib.sha1()
+        for word, category in sorted(self.words.items()):
+            digest.update(f"{word}\t{category}\n".encode('utf-8'))
+
+        # walk the phrase trie in sorted order
+        stack = [((), self.phrases)]
+        while stack:
+            prefix, node = stack.pop()
+            if _PHRASE_END in node:
+                digest.update(f"{' '.join(prefix)}\t{node[_PHRASE_END]}\n".encode('utf-8'))
+            for token in sorted((key for key in node if key is not _PHRASE_END), reverse=True):
+                stack.append((prefix + (token,), node[token]))
+        return digest.hexdigest()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __contains__(self, word):
+        """
+        Returns True if the single token is in any of the lexicon lists.
+        """
+        return word.lower() in self.words
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __len__(self):
+        """
+        Returns the number of single word entries in the index.
+        """
+        return len(self.words)
+
+
+class MergedLexiconIndex:
+    """
+    Several LexiconIndex objects merged into one token dictionary, so a sentence is lowercased
+    and looked up once for all of them. Each entry packs the category bitmask of lexicon k
+    into bits CATEGORY_BITS * k and up. Phrases stay in the trie of their own lexicon and
+    phrase_starts maps the first token of every phrase to a bitmask of the lexicons (bit k)
+    that have a phrase starting with it, so a lexicon's trie is only walked when needed.
+    """
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __init__(self, lexicons):
+        """
+        Merges the word dictionaries of the lexicons, in order.
+        """
+        self.lexicons = list(lexicons)
+        self.words = {} # token -> packed category bitmasks
+        self.phrase_starts = {} # first token of a phrase -> bitmask of lexicon numbers
+        for number, lexicon in enumerate(self.lexicons):
+            shift = CATEGORY_BITS * number
+            for word, category in lexicon.words.items():
+                self.words[word] = self.words.get(word, NEUTRAL) | (category << shift)
+            for token in lexicon.phrases:
+                self.phrase_starts[token] = self.phrase_starts.get(token, 0) | (1 << number)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def categorize_all(self, words):
+        """
+        Converts a list of tokens into one list of category bitmasks per lexicon, the same
+        lists each lexicon's categorize would return.
+        """
+        words = [word.lower() for word in words] # make words lowercase once
+        lookup = self.words.get
+        packed = [lookup(word, NEUTRAL) for word in words]
+
+        # lexicons which may match a phrase in this sentence
+        phrase_lexicons = 0
+        if self.phrase_starts:
+            starts = self.phrase_starts.get
+            for word in words:
+                phrase_lexicons |= starts(word, 0)
+
+        all_categories = []
+        for number, lexicon in enumerate(self.lexicons):
+            if phrase_lexicons >> number & 1:
+                all_categories.append(lexicon.categorize(words))
+            else:
+                shift = CATEGORY_BITS * number
+                all_categories.append([entry >> shift & CATEGORY_MASK for entry in packed])
+        return all_categories
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __len__(self):
+        """
+        Returns the number of merged lexicons.
+        """
+        return len(self.lexicons)
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def score_categories(categories, use_negation=False, use_modifiers=False,
+                     intensifier_multiplier=1.5, downtoner_multiplier=0.5):
+    """
+    Scores a sequence of category bitmasks. A negation word flips the sign of the next
+    sentiment word, an intensifier or downtoner scales it (and cancels a pending negation),
+    and any other word resets both effects. Negation takes priority over modifiers, which
+    take priority over positive and negative entries.
+    """
+    sentiment_score = 0
+    negation = 1
+    modifier = 1
+
+    for category in categories:
+        # check if word is a negation word
+        if use_negation and category & NEGATION:
+            negation *= -1 # multiply by -1
+            continue # move on to next word
+
+        # check if word is modifier(intensifier or downtoner)
+        if use_modifiers:
+            if category & INTENSIFIER:
+                modifier = intensifier_multiplier
+                negation = 1 # a modifier cancels a pending negation
+                continue
+            elif category & DOWNTONER:
+                modifier = downtoner_multiplier
+                negation = 1
+                continue
+
+        # add positive or negative word to sentiment score
+        if category & POSITIVE:
+            sentiment_score += 1 * negation * modifier
+        elif category & NEGATIVE:
+            sentiment_score += -1 * negation * modifier
+
+        # any other word resets negation and modifier
+        negation = 1
+        modifier = 1
+
+    # return a sentiment score of 0 as 0
+    if sentiment_score == 0:
+        sentiment_score = int(0)
+
+    return sentiment_score
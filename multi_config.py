@@ -0,0 +1,210 @@
+# multi_config.py
+# Alekya Veluri
+#
+# Scores text under several lexicon and flag configurations in a single pass. Every sentence is
+# split, tokenized and looked up once, and one score per configuration comes out side by side.
+
+# import necessary libraries
+from lexicon import LexiconIndex, MergedLexiconIndex, score_categories
+from sentiment_results import SentimentResults
+from text_tokenizers import get_tokenizer, sentence_spans, ensure_resources
+
+
+class MultiConfigScorer:
+    """
+    Scores sentences with N configurations at once. A configuration is a tuple
+    (analyzer, use_negation, use_modifiers) where the analyzer supplies the lexicon and the
+    modifier multipliers. Distinct lexicons are merged into one MergedLexiconIndex and
+    configurations that share a lexicon also share its category lists, so adding a flag
+    variant of an existing lexicon only costs the scoring loop. The lexicon of an analyzer
+    whose tokenizer differs from the scorer's is rebuilt with the scorer's tokenizer, so
+    entries such as "isn't" are split the same way as the sentences.
+    """
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __init__(self, configs, tokenizer=None, names=None):
+        """
+        Creates a scorer for the configurations. All of them are tokenized with one tokenizer,
+        by default the tokenizer of the first analyzer; analyzers with different tokenizers
+        need an explicit tokenizer. names labels the configurations, by default 0..N-1.
+        """
+        self.configs = [(analyzer, bool(use_negation), bool(use_modifiers)) for analyzer, use_negation, use_modifiers in configs]
+        if not self.configs:
+            raise ValueError("At least one configuration is required")
+        self.names = list(names) if names is not None else list(range(len(self.configs)))
+        if len(self.names) != len(self.configs):
+            raise ValueError("names must have one entry per configuration")
+
+        if tokenizer is None:
+            tokenizer_names = {getattr(analyzer.tokenizer, 'name', None) for analyzer, _, _ in self.configs}
+            if len(tokenizer_names) > 1:
+                raise ValueError(f"The analyzers use different tokenizers {sorted(map(str, tokenizer_names))}, pass one tokenizer")
+            tokenizer = self.configs[0][0].tokenizer
+        self.tokenizer = get_tokenizer(tokenizer)
+
+        # merge each distinct lexicon once, configurations point at their lexicon's number
+        lexicons = []
+        lexicon_numbers = {} # lexicon fingerprint -> number in the merged index
+        self._scoring = [] # (lexicon number, use_negation, use_modifiers, intensifier, downtoner) per configuration
+        for analyzer, use_negation, use_modifiers in self.configs:
+            lexicon = analyzer.lexicon
+            if not self._same_tokenizer(analyzer.tokenizer):
+                lexicon = LexiconIndex(analyzer.positive_words, analyzer.negative_words, analyzer.negation_words,
+                                       analyzer.intensifiers, analyzer.downtoners, self.tokenizer)
+            fingerprint = lexicon.fingerprint()
+            if fingerprint not in lexicon_numbers:
+                lexicon_numbers[fingerprint] = len(lexicons)
+                lexicons.append(lexicon)
+            self._scoring.append((lexicon_numbers[fingerprint], use_negation, use_modifiers,
+                                  analyzer.INTENSIFIER_MULTIPLIER, analyzer.DOWNTONER_MULTIPLIER))
+        self.index = MergedLexiconIndex(lexicons)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _same_tokenizer(self, tokenizer):
+        """
+        Returns True if tokenizer splits text like the scorer's tokenizer: the same object or
+        the same named backend.
+        """
+        if tokenizer is self.tokenizer:
+            return True
+        name = getattr(tokenizer, 'name', None)
+        return name is not None and name == getattr(self.tokenizer, 'name', None)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def score_sentence(self, sentence):
+        """
+        Returns a tuple with the score of the sentence under each configuration.
+        """
+        all_categories = self.index.categorize_all(self.tokenizer.word_tokenize(sentence))
+        return tuple(score_categories(all_categories[number], use_negation, use_modifiers, intensifier, downtoner)
+                     for number, use_negation, use_modifiers, intensifier, downtoner in self._scoring)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def iter_sentence_scores(self, text_lines_list, with_spans=False):
+        """
+        Splits lines of text into sentences and yields (sentence, scores, line_number, start, end)
+        for each one, where scores has one entry per configuration. start and end are the
+        offsets of the sentence in its line when with_spans is True and None otherwise.
+        """
+        for line_number, line in enumerate(text_lines_list):
+            if with_spans:
+                for start, end in sentence_spans(self.tokenizer, line):
+                    sentence = line[start:end]
+                    yield sentence, self.score_sentence(sentence), line_number, start, end
+            else:
+                for sentence in self.tokenizer.sent_tokenize(line):
+                    yield sentence, self.score_sentence(sentence), line_number, None, None
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def score_series(self, text_lines_list):
+        """
+        Returns one list of sentence scores per configuration, aligned sentence by sentence.
+        """
+        series = [[] for _ in self.configs]
+        for _, scores, _, _, _ in self.iter_sentence_scores(text_lines_list):
+            for configuration_series, score in zip(series, scores):
+                configuration_series.append(score)
+        return series
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def analyze_sentiment(self, text_lines_list, result_format='dict'):
+        """
+        Returns one result per configuration, each equal to what the configuration's analyzer
+        returns from analyze_sentiment with the same result_format ('dict', 'columnar' or 'summary').
+        """
+        if result_format == 'columnar':
+            lines = text_lines_list if isinstance(text_lines_list, list) else list(text_lines_list)
+            results = [SentimentResults(lines) for _ in self.configs]
+            for _, scores, line_number, start, end in self.iter_sentence_scores(lines, with_spans=True):
+                for result, score in zip(results, scores):
+                    result.append(score, line_number, start, end)
+            return results
+        if result_format not in ('dict', 'summary'):
+            raise ValueError(f"Unknown result_format '{result_format}', expected 'dict', 'columnar' or 'summary'")
+        keep_details = result_format == 'dict'
+        get_sentiment = self.configs[0][0].get_sentiment
+
+        # running totals of every configuration, updated in a single pass
+        detailed_results = [[] for _ in self.configs]
+        total_scores = [0] * len(self.configs)
+        sentiment_counts = [{'positive': 0, 'negative': 0, 'neutral': 0} for _ in self.configs]
+        sentence_count = 0
+
+        for sentence, scores, _, _, _ in self.iter_sentence_scores(text_lines_list):
+            sentence_count += 1
+            for number, score in enumerate(scores):
+                sentiment = get_sentiment(score)
+                total_scores[number] += score
+                sentiment_counts[number][sentiment] += 1
+                if keep_details:
+                    detailed_results[number].append({'sentiment': sentiment, 'score': score, 'sentence': sentence})
+
+        results = []
+        for number in range(len(self.configs)):
+            overall_sentiment_score = total_scores[number] / sentence_count if sentence_count > 0 else 0
+            overall = {'overall_sentiment': get_sentiment(overall_sentiment_score), 'score': overall_sentiment_score}
+            if keep_details:
+                results.append({'detailed_results': detailed_results[number], 'overall_sentiment': overall,
+                                'sentiment_counts': sentiment_counts[number]})
+            else:
+                results.append({'overall_sentiment': overall, 'sentiment_counts': sentiment_counts[number]})
+        return results
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __len__(self):
+        """
+        Returns the number of configurations.
+        """
+        return len(self.configs)
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def main():
+    """
+    Checks every configuration of a scorer against analyze_sentiment of its analyzer, in the
+    dict, summary and columnar formats. Analyzers whose tokenizer differs from the scorer's
+    are compared with an analyzer of the same word lists using the scorer's tokenizer, which
+    is what the scorer rebuilds their lexicon with. The text has contractions which the nltk
+    tokenizer splits into several tokens.
+    """
+    from sentiment_analyzer import SentimentAnalyzer # imported here, only the checks need it
+    ensure_resources(download=True) # the nltk tokenizer needs the Punkt data
+
+    word_lists = (["happy", "great", "good"], ["sad", "bad", "awful"], ["not", "never", "isn't", "can't"],
+                  ["very", "extremely"], ["somewhat", "a bit"])
+    other_lists = (["fine"], ["terrible", "sad"], ["not", "wasn't", "don't"], ["really"], ["slightly"])
+    lines = ["It isn't good. It can't be bad, it is very happy!\n", "\n",
+             "I don't feel fine and it wasn't really terrible. Things were a bit sad.\n",
+             "It isn't awful, it's never great and it can't be very sad.\n"]
+
+    for tokenizer in ('nltk', 'regex'):
+        other = 'regex' if tokenizer == 'nltk' else 'nltk'
+        # one analyzer per (word lists, tokenizer), including lexicons built by the other tokenizer
+        analyzers = [SentimentAnalyzer(*words, tokenizer=name) for words in (word_lists, other_lists) for name in (tokenizer, other)]
+        configs = [(analyzer, use_negation, use_modifiers) for analyzer in analyzers
+                   for use_negation in (False, True) for use_modifiers in (False, True)]
+        scorer = MultiConfigScorer(configs, tokenizer=tokenizer)
+
+        for result_format in ('dict', 'summary', 'columnar'):
+            results = scorer.analyze_sentiment(lines, result_format)
+            for (analyzer, use_negation, use_modifiers), result in zip(configs, results):
+                words = (analyzer.positive_words, analyzer.negative_words, analyzer.negation_words,
+                         analyzer.intensifiers, analyzer.downtoners)
+                reference = SentimentAnalyzer(*words, tokenizer=tokenizer)
+                expected = reference.analyze_sentiment(lines, use_negation, use_modifiers, result_format)
+                if result_format == 'columnar':
+                    result, expected = result.to_dict(), expected.to_dict()
+                assert result == expected, f"Failed on {result_format} with {analyzer.tokenizer.name} lexicon, " \
+                                           f"{tokenizer} scorer, negation={use_negation} modifiers={use_modifiers}"
+
+    # analyzers with different tokenizers need an explicit tokenizer
+    try:
+        MultiConfigScorer([(SentimentAnalyzer(tokenizer='nltk'), True, True), (SentimentAnalyzer(tokenizer='regex'), True, True)])
+        raise AssertionError("Failed on mixed tokenizers without an explicit tokenizer")
+    except ValueError:
+        pass
+    print("All multi-configuration scorer tests passed!")
+
+
+if __name__ == "__main__":
+    main()
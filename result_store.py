@@ -0,0 +1,266 @@
+# result_store.py
+# Alekya Veluri
+#
+# Persistent store of chapter results for whole books. Entries are keyed on a hash of the file
+# contents and everything else that affects the scores, so a book is only analyzed again when
+# its text, its chapter boundaries, the lexicon, the flags or the scoring rules change.
+
+# import necessary libraries
+import hashlib
+import json
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+from sqlite_store import SQLiteBacked
+
+
+class ResultStore(SQLiteBacked):
+    """
+    A SQLite store of chapter summaries, and optionally per-sentence score arrays, keyed on
+    (file content hash, chapter boundaries, analyzer fingerprint, use_negation, use_modifiers),
+    where the fingerprint includes ANALYZER_VERSION. The database uses WAL mode and a busy timeout so many worker processes
+    can read and write it at once, and once it holds more than max_bytes of entries the least
+    recently used ones are evicted. A pickled copy keeps only the configuration and opens its
+    own connection.
+    """
+
+    # __init__ arguments kept when pickling
+    _state_fields = ('path', 'max_bytes', 'busy_timeout')
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __init__(self, path, max_bytes=1024 ** 3, busy_timeout=60):
+        """
+        Creates a store backed by the SQLite database at path, opened on first use.
+        busy_timeout is how many seconds a writer waits for another process to finish.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.busy_timeout = busy_timeout
+        self._connection = None
+
+        # hit and miss statistics of this process
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    @staticmethod
+    def make_key(content_hash, chapters, fingerprint, use_negation, use_modifiers):
+        """
+        Builds the key of an entry, a 16 byte digest of the content hash, the chapter boundary
+        settings (a JSON serializable description such as {'chapters': 'fake', 'lines_per_chapter': 40}),
+        the analyzer fingerprint (which covers the analyzer version) and the two flags.
+        """
+        description = json.dumps([content_hash, chapters, fingerprint, bool(use_negation), bool(use_modifiers)],
+                                 sort_keys=True, separators=(',', ':'))
+        return hashlib.blake2b(description.encode('utf-8'), digest_size=16).digest()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _create_tables(self, connection):
+        """
+        Creates the results table and its index on the time of last use.
+        """
+        connection.execute("CREATE TABLE IF NOT EXISTS results (key BLOB PRIMARY KEY, chapters BLOB, "
+                           "scores BLOB, size INTEGER, last_used REAL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def get(self, key):
+        """
+        Returns the entry stored under key as a dict with 'chapters' (a list of
+        (title, summary) pairs), 'metadata' and 'scores' (a list of per-chapter score lists,
+        or None if they were not stored), or None if there is no entry.
+        """
+        database = self._database()
+        row = database.execute("SELECT chapters, scores FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        database.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key)) # mark as recently used
+
+        entry = json.loads(zlib.decompress(row[0]))
+        return {'chapters': [tuple(chapter) for chapter in entry['chapters']], 'metadata': entry['metadata'],
+                'scores': _unpack_scores(row[1]) if row[1] is not None else None}
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def put(self, key, chapters, metadata=None, scores=None):
+        """
+        Stores the (title, summary) pairs of a book's chapters with optional metadata and
+        per-chapter lists of sentence scores, then evicts old entries if the store is too big.
+        """
+        packed_chapters = zlib.compress(json.dumps({'chapters': [list(chapter) for chapter in chapters],
+                                                    'metadata': metadata or {}}).encode('utf-8'))
+        packed_scores = _pack_scores(scores) if scores is not None else None
+        size = len(packed_chapters) + (len(packed_scores) if packed_scores is not None else 0)
+
+        with self._write() as database: # one writer at a time across processes
+            database.execute("INSERT OR REPLACE INTO results (key, chapters, scores, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                             (key, packed_chapters, packed_scores, size, time.time()))
+            self._evict(database)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _evict(self, database):
+        """
+        Deletes the least recently used entries until the store holds at most max_bytes.
+        """
+        (total,) = database.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()
+        if total <= self.max_bytes:
+            return
+        stale_keys = []
+        for key, size in database.execute("SELECT key, size FROM results ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            stale_keys.append((key,))
+            total -= size
+        database.executemany("DELETE FROM results WHERE key = ?", stale_keys)
+        self.evictions += len(stale_keys)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def stats(self):
+        """
+        Returns the hit and miss statistics of this process and the size of the store.
+        """
+        entries, size = self._database().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'entries': entries,
+                'bytes': size, 'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __len__(self):
+        """
+        Returns the number of entries in the store.
+        """
+        return self._database().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def file_content_hash(path, chunk_size=1024 * 1024):
+    """
+    Returns the hex SHA-256 digest of a file's contents, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+#``````````````````````````````````````````````````````````````````````````````````
+def _pack_scores(scores):
+    """
+    Packs per-chapter score lists into compressed bytes: the chapter count, the length of each
+    chapter and all scores as little-endian float64.
+    """
+    lengths = array('I', (len(chapter_scores) for chapter_scores in scores))
+    values = array('d', (score for chapter_scores in scores for score in chapter_scores))
+    if sys.byteorder != 'little':
+        lengths.byteswap()
+        values.byteswap()
+    return zlib.compress(struct.pack("<I", len(lengths)) + lengths.tobytes() + values.tobytes())
+
+#``````````````````````````````````````````````````````````````````````````````````
+def _unpack_scores(packed):
+    """
+    Unpacks the bytes written by _pack_scores into a list of per-chapter score lists.
+    """
+    data = zlib.decompress(packed)
+    (count,) = struct.unpack_from("<I", data)
+    lengths = array('I')
+    lengths.frombytes(data[4:4 + 4 * count])
+    values = array('d')
+    values.frombytes(data[4 + 4 * count:])
+    if sys.byteorder != 'little':
+        lengths.byteswap()
+        values.byteswap()
+    scores = []
+    position = 0
+    for length in lengths:
+        scores.append(values[position:position + length].tolist())
+        position += length
+    return scores
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def main():
+    """
+    Checks the store with gbas.analyze_book on synthetic books: a rerun of an unchanged book
+    must return the same results without scoring a single sentence, changing the flags, the
+    text, the analyzer version or asking for sentence scores must score again, results must
+    survive pickling the store (as sent to a worker process), and a small store must evict
+    down to its size limit.
+    """
+    import os
+    import pickle
+    import tempfile
+    import gbas
+    from synthetic_books import generate_book
+    from sentiment_analyzer import SentimentAnalyzer
+
+    analyzer = SentimentAnalyzer(gbas.starter_positive_words, gbas.starter_negative_words, gbas.starter_negation_words,
+                                 gbas.starter_intensifiers, gbas.starter_downtoners, tokenizer='regex')
+
+    # number of sentences analyze_book scores
+    def scored_sentences(*args, **kwargs):
+        with analyzer.instrument() as stats:
+            book = gbas.analyze_book(*args, workers=1, **kwargs)
+        return book, stats.to_dict()['counters']['sentences']
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for number in range(4):
+            paths.append(os.path.join(directory, f"book{number}.txt"))
+            with open(paths[-1], "w") as file:
+                file.writelines(generate_book(chapters=12, lines_per_chapter=30, seed=number))
+
+        with ResultStore(os.path.join(directory, "results.sqlite")) as store:
+            expected, _ = scored_sentences(paths[0], analyzer)
+            first, count = scored_sentences(paths[0], analyzer, store=store)
+            assert first == expected and count > 0 and len(store) == 2, "Failed on the first run"
+            rerun, count = scored_sentences(paths[0], analyzer, store=store)
+            assert rerun == expected and count == 0, "Failed on the rerun of an unchanged book"
+            assert store.stats()['hits'] == 2, "Failed on the store hits"
+
+            # anything that affects the scores is scored again
+            assert scored_sentences(paths[0], analyzer, use_negation=False, store=store)[1] > 0, "Failed on changed flags"
+            with_scores, count = scored_sentences(paths[0], analyzer, store=store, keep_scores=True)
+            assert count > 0 and with_scores['gutenberg_sentence_scores'] is not None, "Failed on keep_scores"
+            assert scored_sentences(paths[0], analyzer, store=store, keep_scores=True) == (with_scores, 0), "Failed on stored sentence scores"
+            assert scored_sentences(paths[0], analyzer, store=store)[1] == 0, "Failed on summaries of an entry with sentence scores"
+            with open(paths[0], "a") as file:
+                file.write("One more happy line.\n")
+            assert scored_sentences(paths[0], analyzer, store=store)[1] > 0, "Failed on changed text"
+
+            # a new analyzer version changes the fingerprint, so stored results are not reused
+            import sentiment_analyzer
+            sentiment_analyzer.ANALYZER_VERSION += 1
+            try:
+                newer = SentimentAnalyzer(analyzer.positive_words, analyzer.negative_words, analyzer.negation_words,
+                                          analyzer.intensifiers, analyzer.downtoners, tokenizer='regex')
+                newer.fingerprint # computed now, while the new version is set
+            finally:
+                sentiment_analyzer.ANALYZER_VERSION -= 1
+            assert newer.fingerprint != analyzer.fingerprint, "Failed on the fingerprint of a new analyzer version"
+            with newer.instrument() as stats:
+                gbas.analyze_book(paths[0], newer, workers=1, store=store)
+            assert stats.to_dict()['counters']['sentences'] > 0, "Failed on results of an older analyzer version"
+
+            # a pickled copy opens its own connection to the same entries
+            copy = pickle.loads(pickle.dumps(store))
+            assert len(copy) == len(store) and scored_sentences(paths[0], analyzer, store=copy)[1] == 0, "Failed on a pickled store"
+            copy.close()
+
+        # entries beyond max_bytes are evicted, least recently used first
+        with ResultStore(os.path.join(directory, "small.sqlite"), max_bytes=2000) as small:
+            for path in paths:
+                gbas.analyze_book(path, analyzer, workers=1, store=small)
+            stats = small.stats()
+            assert stats['evictions'] > 0 and 0 < stats['bytes'] <= 2000, "Failed on eviction"
+
+    print("All result store tests passed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# sampling.py
+# Alekya Veluri
+#
+# Sampling based estimate of the overall sentiment score of a text. Lines are sampled at random
+# within contiguous strata, only the sampled lines are split and scored, and the mean sentence
+# score is estimated with a confidence interval until a tolerance or time budget is met.
+
+# import necessary libraries
+import math
+import random
+import time
+from statistics import NormalDist
+
+
+class _Stratum:
+    """
+    A contiguous block of non-blank lines, visited in a random order, with the running sums
+    of the per-line totals (y = sum of sentence scores, x = number of sentences) sampled so far.
+    """
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __init__(self, line_numbers, rng):
+        self.order = list(line_numbers)
+        rng.shuffle(self.order)
+        self.size = len(self.order)
+        self.taken = 0
+        self.sum_y = self.sum_x = 0.0
+        self.sum_yy = self.sum_xx = self.sum_xy = 0.0
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def take(self, count):
+        """
+        Returns the next count line numbers of the random order.
+        """
+        line_numbers = self.order[self.taken:self.taken + count]
+        self.taken += len(line_numbers)
+        return line_numbers
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def add(self, y, x):
+        """
+        Adds the totals of one sampled line.
+        """
+        self.sum_y += y
+        self.sum_x += x
+        self.sum_yy += y * y
+        self.sum_xx += x * x
+        self.sum_xy += x * y
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def residual_variance(self, ratio):
+        """
+        Returns the sample variance of y - ratio * x over the sampled lines.
+        """
+        n = self.taken
+        residual_sum = self.sum_y - ratio * self.sum_x
+        squares = self.sum_yy - 2 * ratio * self.sum_xy + ratio * ratio * self.sum_xx
+        return max(squares - residual_sum * residual_sum / n, 0.0) / (n - 1)
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def estimate_sentiment(analyzer, text_lines_list, use_negation=False, use_modifiers=False, tolerance=0.05,
+                       confidence=0.95, time_budget=None, strata=10, batch_lines=200, seed=0):
+    """
+    Estimates the overall sentiment score (the mean sentence score) of lines of text by scoring
+    a stratified random sample of lines. The non-blank lines are split into strata contiguous
+    blocks so the sample follows the course of the text, and lines are drawn from every stratum
+    in proportion to its size, batch_lines per round. Each sampled line contributes its sum
+    of sentence scores and its number of sentences, and the mean is their combined ratio
+    estimate. Sampling stops when the confidence interval half width is at most tolerance,
+    when time_budget seconds have passed or when every line has been scored (the exact score).
+    seed makes the sample reproducible, None samples differently on each call.
+
+    Returns a dict shaped like the 'summary' result of analyze_sentiment, with sentiment_counts
+    counting the sampled sentences, plus an 'estimate' dict holding lower, upper, half_width,
+    confidence, sampled_lines, total_lines (non-blank), sampled_sentences,
+    estimated_sentences, exact and stopped_by ('tolerance', 'time_budget' or 'exhausted').
+    """
+    start_time = time.perf_counter()
+    lines = text_lines_list if isinstance(text_lines_list, list) else list(text_lines_list)
+    population = [number for number, line in enumerate(lines) if line.strip()]
+    total_lines = len(population)
+    rng = random.Random(seed)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+
+    # contiguous strata of nearly equal size
+    stratum_count = max(1, min(strata, total_lines))
+    bounds = [total_lines * h // stratum_count for h in range(stratum_count + 1)]
+    all_strata = [_Stratum(population[bounds[h]:bounds[h + 1]], rng) for h in range(stratum_count)]
+
+    sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+    sampled_sentences = 0
+    ratio = 0
+    half_width = 0.0 # an empty text is known exactly
+    estimated_sentences = 0.0
+    stopped_by = 'exhausted'
+
+    while total_lines:
+        # draw this round's lines, at least two per stratum so each has a variance
+        batch = [] # (stratum, line number)
+        for stratum in all_strata:
+            count = max(2, round(batch_lines * stratum.size / total_lines))
+            batch.extend((stratum, number) for number in stratum.take(count))
+        if not batch:
+            break
+
+        # score the sampled lines together and total them per line
+        line_totals = {number: [0.0, 0] for _, number in batch}
+        sampled_numbers = [number for _, number in batch]
+        for _, score, index, _, _ in analyzer.iter_sentence_scores([lines[number] for number in sampled_numbers],
+                                                                   use_negation, use_modifiers):
+            totals = line_totals[sampled_numbers[index]]
+            totals[0] += score
+            totals[1] += 1
+            sentiment_counts[analyzer.get_sentiment(score)] += 1
+            sampled_sentences += 1
+        for stratum, number in batch:
+            stratum.add(*line_totals[number])
+
+        # combined ratio estimate of the mean sentence score and its variance
+        estimated_score = sum(stratum.size * stratum.sum_y / stratum.taken for stratum in all_strata)
+        estimated_sentences = sum(stratum.size * stratum.sum_x / stratum.taken for stratum in all_strata)
+        ratio = estimated_score / estimated_sentences if estimated_sentences else 0
+        variance = 0.0
+        for stratum in all_strata:
+            if stratum.taken == stratum.size: # fully scored, no sampling error left
+                continue
+            if stratum.taken < 2:
+                variance = math.inf
+                break
+            variance += (stratum.size ** 2 * (1 - stratum.taken / stratum.size)
+                         * stratum.residual_variance(ratio) / stratum.taken)
+        half_width = z * math.sqrt(variance) / estimated_sentences if estimated_sentences else math.inf
+
+        if all(stratum.taken == stratum.size for stratum in all_strata):
+            half_width = 0.0
+            stopped_by = 'exhausted'
+            break
+        if estimated_sentences and half_width <= tolerance:
+            stopped_by = 'tolerance'
+            break
+        if time_budget is not None and time.perf_counter() - start_time >= time_budget:
+            stopped_by = 'time_budget'
+            break
+
+    sampled_lines = sum(stratum.taken for stratum in all_strata) if total_lines else 0
+    return {
+        'overall_sentiment': {'overall_sentiment': analyzer.get_sentiment(ratio), 'score': ratio},
+        'sentiment_counts': sentiment_counts,
+        'estimate': {'lower': ratio - half_width, 'upper': ratio + half_width, 'half_width': half_width,
+                     'confidence': confidence, 'sampled_lines': sampled_lines, 'total_lines': total_lines,
+                     'sampled_sentences': sampled_sentences, 'estimated_sentences': estimated_sentences,
+                     'exact': stopped_by == 'exhausted', 'stopped_by': stopped_by},
+    }
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def main():
+    """
+    Checks the estimate against the exact score of analyze_sentiment on a synthetic book. Over
+    20 seeds the 95% interval must cover the exact score at least 17 times while scoring only
+    part of the lines, an empty or blank text must give the exact score 0, and a text with
+    fewer lines than one round must be scored completely and exactly.
+    """
+    from sentiment_analyzer import SentimentAnalyzer
+    from synthetic_books import generate_book
+
+    analyzer = SentimentAnalyzer(tokenizer='regex')
+    lines = generate_book(chapters=60, lines_per_chapter=120, seed=5)
+    exact = analyzer.analyze_sentiment(lines, True, True, 'summary')['overall_sentiment']['score']
+
+    # the interval covers the exact score for about 95% of the seeds
+    covered = 0
+    for seed in range(20):
+        estimate = estimate_sentiment(analyzer, lines, True, True, tolerance=0.05, seed=seed)['estimate']
+        assert estimate['stopped_by'] == 'tolerance' and not estimate['exact'], f"Failed on stopping with seed {seed}"
+        assert estimate['sampled_lines'] < estimate['total_lines'], f"Failed on sampling part of the lines with seed {seed}"
+        assert estimate['half_width'] <= 0.05, f"Failed on the tolerance with seed {seed}"
+        covered += estimate['lower'] <= exact <= estimate['upper']
+    assert covered >= 17, f"Failed on coverage, {covered} of 20 intervals cover the exact score"
+
+    # a time budget stops after the first round
+    estimate = estimate_sentiment(analyzer, lines, True, True, tolerance=0, time_budget=0)['estimate']
+    assert estimate['stopped_by'] == 'time_budget', "Failed on the time budget"
+
+    # empty and blank texts are known exactly
+    for text in ([], ["\n", "   \n"]):
+        result = estimate_sentiment(analyzer, text, True, True)
+        assert result['overall_sentiment']['score'] == 0, f"Failed on the score of {text}"
+        assert result['estimate']['exact'] and result['estimate']['half_width'] == 0.0, f"Failed on the interval of {text}"
+        assert result['estimate']['sampled_lines'] == 0, f"Failed on the sampled lines of {text}"
+
+    # a tiny text is exhausted in the first round and scored exactly
+    tiny = ["It was very good.\n", "\n", "Then it was not bad. It was sad!\n", "The end.\n"]
+    expected = analyzer.analyze_sentiment(tiny, True, True, 'summary')
+    result = estimate_sentiment(analyzer, tiny, True, True)
+    assert result['estimate']['stopped_by'] == 'exhausted' and result['estimate']['exact'], "Failed on exhausting a tiny text"
+    assert result['estimate']['sampled_lines'] == result['estimate']['total_lines'] == 3, "Failed on the lines of a tiny text"
+    assert abs(result['overall_sentiment']['score'] - expected['overall_sentiment']['score']) < 1e-12, "Failed on the score of a tiny text"
+    assert result['sentiment_counts'] == expected['sentiment_counts'], "Failed on the counts of a tiny text"
+    print("All sampling tests passed!")
+
+
+if __name__ == "__main__":
+    main()
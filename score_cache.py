@@ -0,0 +1,184 @@
+# score_cache.py
+# Alekya Veluri
+#
+# Cache of sentence scores for SentimentAnalyzer. Recently used scores are kept in a size bounded
+# LRU in memory, and an optional SQLite file keeps them across runs and worker processes.
+
+# import necessary libraries
+import hashlib
+from collections import OrderedDict
+
+from sqlite_store import SQLiteBacked
+
+# returned by get when a key is not cached (a score of 0 is a valid cached value)
+MISSING = object()
+
+
+class SentenceScoreCache(SQLiteBacked):
+    """
+    A cache of sentence sentiment scores keyed on (sentence hash, lexicon fingerprint,
+    use_negation, use_modifiers). At most max_size scores are kept in memory, evicting the
+    least recently used. If path is given, scores are also written to a SQLite database at
+    that path and looked up there on a memory miss, so they persist across runs and are
+    shared by worker processes. Each put_many is committed in one short transaction.
+    """
+
+    # __init__ arguments kept when pickling, a copy sent to a worker starts with an empty LRU
+    _state_fields = ('max_size', 'path', 'busy_timeout')
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __init__(self, max_size=100000, path=None, busy_timeout=30):
+        """
+        Creates an empty cache. The SQLite store at path, if given, is opened on first use.
+        busy_timeout is how many seconds a writer waits for another process to finish.
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._entries = OrderedDict() # key -> score, oldest first
+        self._connection = None
+
+        # hit and miss statistics
+        self.hits = 0 # found in memory
+        self.disk_hits = 0 # found in the SQLite store
+        self.misses = 0
+        self.evictions = 0
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    @staticmethod
+    def make_key(sentence, fingerprint, use_negation, use_modifiers):
+        """
+        Builds the cache key of a sentence, a 16 byte digest of the sentence, the lexicon
+        fingerprint and the two scoring flags.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{fingerprint}|{int(bool(use_negation))}{int(bool(use_modifiers))}|".encode())
+        digest.update(sentence.encode('utf-8', 'surrogatepass'))
+        return digest.digest()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def get(self, key):
+        """
+        Returns the cached score for key, or MISSING if it is not cached.
+        """
+        score = self._entries.get(key, MISSING)
+        if score is not MISSING:
+            self._entries.move_to_end(key) # mark as most recently used
+            self.hits += 1
+            return score
+
+        # fall back to the persistent store
+        if self.path is not None:
+            row = self._database().execute("SELECT score FROM scores WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.disk_hits += 1
+                self._remember(key, row[0])
+                return row[0]
+
+        self.misses += 1
+        return MISSING
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def put(self, key, score):
+        """
+        Stores the score for key in memory and, if configured, in the persistent store.
+        """
+        self.put_many([(key, score)])
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def put_many(self, items):
+        """
+        Stores (key, score) pairs in memory and, if configured, writes them to the persistent
+        store in a single transaction.
+        """
+        items = list(items)
+        for key, score in items:
+            self._remember(key, score)
+        if self.path is not None and items:
+            with self._write() as database:
+                database.executemany("INSERT OR REPLACE INTO scores (key, score) VALUES (?, ?)", items)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _remember(self, key, score):
+        """
+        Adds a score to the in-memory LRU, evicting the least recently used entry if full.
+        """
+        self._entries[key] = score
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _create_tables(self, connection):
+        """
+        Creates the score table of the persistent store.
+        """
+        connection.execute("CREATE TABLE IF NOT EXISTS scores (key BLOB PRIMARY KEY, score)")
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def clear(self):
+        """
+        Empties the in-memory LRU and resets the statistics. The persistent store is kept.
+        """
+        self._entries.clear()
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def stats(self):
+        """
+        Returns hit and miss statistics as a dict.
+        """
+        lookups = self.hits + self.disk_hits + self.misses
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': len(self._entries),
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0}
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __len__(self):
+        """
+        Returns the number of scores held in memory.
+        """
+        return len(self._entries)
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def main():
+    """
+    Checks the persistent store when it is shared by worker processes: analyze_many with a
+    path-backed cache and four workers must return the same results as without a cache, every
+    sentence scored by the workers must be in the database afterwards, and a new analyzer
+    must then find all of them there.
+    """
+    import os
+    import tempfile
+    # imported here, sentiment_analyzer imports this module and must share its MISSING marker
+    # with the cache even when this file is run as a script
+    from sentiment_analyzer import SentimentAnalyzer
+    from score_cache import SentenceScoreCache
+
+    words = (["happy", "great"], ["sad", "bad"], ["not", "never"], ["very"], ["somewhat"])
+    documents = [[f"Day {n} of chapter {c} was not great. It was very bad, then somewhat happy." for n in range(50)]
+                 for c in range(40)]
+    expected = SentimentAnalyzer(*words, tokenizer='regex').analyze_many(documents, True, True, workers=1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "scores.sqlite")
+        analyzer = SentimentAnalyzer(*words, tokenizer='regex', cache=SentenceScoreCache(path=path))
+        assert analyzer.analyze_many(documents, True, True, workers=4) == expected, "Failed on results with a shared store"
+        sentences = {sentence for document in documents for sentence in analyzer.get_sentences_from_lines(document)}
+        with SentenceScoreCache(path=path) as cache:
+            assert cache._database().execute("SELECT COUNT(*) FROM scores").fetchone()[0] == len(sentences), "Failed on scores written by workers"
+
+            # a new analyzer finds every score in the store
+            analyzer = SentimentAnalyzer(*words, tokenizer='regex', cache=cache)
+            assert analyzer.analyze_many(documents, True, True, workers=1) == expected, "Failed on results from the store"
+            assert cache.misses == 0 and cache.disk_hits == len(sentences), "Failed on reading the store"
+
+    print("All score cache tests passed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+# scoring_engines.py
+# Alekya Veluri
+#
+# Sentence scoring engines for SentimentAnalyzer. The python engine scores one token at a time,
+# the vectorized engine scores a whole batch of sentences with NumPy array operations.
+
+# import necessary libraries, numpy is imported when a vectorized engine is created
+import time
+from lexicon import POSITIVE, NEGATIVE, NEGATION, INTENSIFIER, DOWNTONER, score_categories
+
+# numpy module, set by _numpy() on first use
+_numpy_module = None
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def _numpy():
+    """
+    Imports numpy on first use and returns the module.
+    """
+    global _numpy_module
+    if _numpy_module is None:
+        import numpy
+        _numpy_module = numpy
+    return _numpy_module
+
+
+class PythonEngine:
+    """
+    Reference engine, scores each sentence with a Python loop over its tokens.
+    """
+
+    name = 'python'
+    batch_size = 1 # sentences are scored as soon as they are split
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def score_sentences(self, analyzer, sentences, use_negation=False, use_modifiers=False):
+        """
+        Returns the list of sentiment scores of the sentences.
+        """
+        stats = analyzer.instrumentation
+        if stats is not None: # timed path
+            all_categories = categorize_sentences(analyzer, sentences, use_negation, use_modifiers)
+            start = time.perf_counter()
+            scores = [score_categories(categories, use_negation, use_modifiers,
+                                       analyzer.INTENSIFIER_MULTIPLIER, analyzer.DOWNTONER_MULTIPLIER)
+                      for categories in all_categories]
+            stats.add_time('scoring', time.perf_counter() - start)
+            return scores
+
+        categorize = analyzer.lexicon.categorize
+        word_tokenize = analyzer.tokenizer.word_tokenize
+        return [score_categories(categorize(word_tokenize(sentence)), use_negation, use_modifiers,
+                                 analyzer.INTENSIFIER_MULTIPLIER, analyzer.DOWNTONER_MULTIPLIER)
+                for sentence in sentences]
+
+
+class VectorizedEngine:
+    """
+    Engine which maps the tokens of a whole batch of sentences to category IDs once and computes
+    every negation and modifier effect with array operations over the ID sequence. Sentences
+    are segments of that sequence and their scores come from a segmented sum. Scores have the
+    same types as the python engine's, ints unless a float multiplier was applied, and batches
+    smaller than min_batch_size are scored by the python engine, which is faster for them.
+    """
+
+    name = 'vectorized'
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __init__(self, batch_size=4096, min_batch_size=32):
+        """
+        batch_size is the number of sentences analyze_sentiment collects before scoring them.
+        numpy is imported here so the first scoring call does not pay for the import.
+        """
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self._small_batches = PythonEngine()
+        _numpy()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def score_sentences(self, analyzer, sentences, use_negation=False, use_modifiers=False):
+        """
+        Returns the list of sentiment scores of the sentences.
+        """
+        if len(sentences) < self.min_batch_size:
+            return self._small_batches.score_sentences(analyzer, sentences, use_negation, use_modifiers)
+
+        stats = analyzer.instrumentation
+        categories = [] # category IDs of every token of every sentence
+        lengths = [] # number of tokens per sentence
+        if stats is not None: # timed path
+            for sentence_categories in categorize_sentences(analyzer, sentences, use_negation, use_modifiers):
+                categories.extend(sentence_categories)
+                lengths.append(len(sentence_categories))
+            start = time.perf_counter()
+        else:
+            categorize = analyzer.lexicon.categorize
+            word_tokenize = analyzer.tokenizer.word_tokenize
+            for sentence in sentences:
+                sentence_categories = categorize(word_tokenize(sentence))
+                categories.extend(sentence_categories)
+                lengths.append(len(sentence_categories))
+
+        np = _numpy()
+        scores, float_scores = score_category_segments(np.array(categories, dtype=np.int8), np.array(lengths, dtype=np.int64),
+                                                       use_negation, use_modifiers,
+                                                       analyzer.INTENSIFIER_MULTIPLIER, analyzer.DOWNTONER_MULTIPLIER)
+
+        # same types as score_categories, an int unless a float multiplier was applied
+        scores = [score if is_float and score != 0 else int(score)
+                  for score, is_float in zip(scores.tolist(), float_scores.tolist())]
+        if stats is not None:
+            stats.add_time('scoring', time.perf_counter() - start)
+        return scores
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def categorize_sentences(analyzer, sentences, use_negation=False, use_modifiers=False):
+    """
+    Tokenizes the sentences and maps them to category lists while recording the time of each
+    step and the token counters in the analyzer's instrumentation.
+    """
+    stats = analyzer.instrumentation
+    word_tokenize = analyzer.tokenizer.word_tokenize
+    categorize = analyzer.lexicon.categorize
+    tokenize_time = lookup_time = 0.0
+    all_categories = []
+    for sentence in sentences:
+        start = time.perf_counter()
+        words = word_tokenize(sentence)
+        middle = time.perf_counter()
+        categories = categorize(words)
+        end = time.perf_counter()
+        tokenize_time += middle - start
+        lookup_time += end - middle
+        stats.count_categories(categories, use_negation, use_modifiers)
+        all_categories.append(categories)
+    stats.add_time('word_tokenize', tokenize_time)
+    stats.add_time('lexicon_lookup', lookup_time)
+    return all_categories
+
+#``````````````````````````````````````````````````````````````````````````````````
+def score_category_segments(categories, lengths, use_negation=False, use_modifiers=False,
+                            intensifier_multiplier=1.5, downtoner_multiplier=0.5):
+    """
+    Scores consecutive segments (sentences) of a category ID array, where lengths gives the
+    number of IDs in each segment. Returns an array with one float score per segment, the same
+    scores as score_categories applied to each segment, and a boolean array which is True for
+    the segments whose score score_categories returns as a float (a float multiplier scaled
+    one of its sentiment words).
+
+    Negation and modifier words are "control" tokens and every other token closes a group of
+    control tokens before it. Within a group the last modifier sets the multiplier and cancels
+    earlier negations, so the sign of the closing token is set by the parity of the negations
+    after the last modifier. Groups also restart at every segment start.
+    """
+    np = _numpy()
+    count = len(categories)
+    segment_count = len(lengths)
+    if count == 0:
+        return np.zeros(segment_count), np.zeros(segment_count, dtype=bool)
+    positions = np.arange(count)
+
+    # resolve each token's role with the same priority as score_categories
+    is_negation = (categories & NEGATION) != 0 if use_negation else np.zeros(count, dtype=bool)
+    if use_modifiers:
+        is_intensifier = ~is_negation & ((categories & INTENSIFIER) != 0)
+        is_downtoner = ~is_negation & ~is_intensifier & ((categories & DOWNTONER) != 0)
+    else:
+        is_intensifier = is_downtoner = np.zeros(count, dtype=bool)
+    is_modifier = is_intensifier | is_downtoner
+    is_plain = ~is_negation & ~is_modifier
+    polarity = np.where((categories & POSITIVE) != 0, 1.0, np.where((categories & NEGATIVE) != 0, -1.0, 0.0))
+
+    # a group starts at each segment start and after each plain token
+    segment_starts = np.cumsum(lengths) - lengths
+    starts_group = np.zeros(count, dtype=bool)
+    starts_group[segment_starts[lengths > 0]] = True
+    starts_group[1:] |= is_plain[:-1]
+    group_start = np.maximum.accumulate(np.where(starts_group, positions, 0))
+
+    # multiplier of the last modifier in the group, if any
+    last_modifier = np.maximum.accumulate(np.where(is_modifier, positions, -1))
+    has_modifier = last_modifier >= group_start
+    modifier_values = np.where(is_intensifier, intensifier_multiplier, downtoner_multiplier)
+    modifier = np.where(has_modifier, modifier_values[np.maximum(last_modifier, 0)], 1.0)
+
+    # parity of the negations between the last modifier (or the group start) and each token
+    negations_before = np.cumsum(is_negation) - is_negation
+    counted_from = np.where(has_modifier, last_modifier + 1, group_start)
+    counted_from = np.minimum(counted_from, positions) # keeps the index in range for modifier tokens
+    negations = negations_before - negations_before[counted_from]
+    sign = 1.0 - 2.0 * (negations & 1)
+
+    # only plain tokens contribute, summed per segment
+    contributions = np.where(is_plain, polarity * sign * modifier, 0.0)
+    segment_ids = np.repeat(np.arange(segment_count), lengths)
+    scores = np.bincount(segment_ids, weights=contributions, minlength=segment_count)
+
+    # segments where a float multiplier scaled a sentiment word
+    float_modifiers = np.where(is_intensifier, isinstance(intensifier_multiplier, float), isinstance(downtoner_multiplier, float))
+    scaled = is_plain & (polarity != 0) & has_modifier & float_modifiers[np.maximum(last_modifier, 0)]
+    float_scores = np.bincount(segment_ids, weights=scaled, minlength=segment_count) > 0
+    return scores, float_scores
+
+
+# engines by name
+ENGINES = {
+    PythonEngine.name: PythonEngine,
+    VectorizedEngine.name: VectorizedEngine,
+}
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def get_engine(engine=None):
+    """
+    Returns a scoring engine. Accepts None (the python default), an engine name
+    ('python' or 'vectorized') or any object with a score_sentences method.
+    """
+    if engine is None:
+        return PythonEngine()
+    if isinstance(engine, str):
+        try:
+            return ENGINES[engine]()
+        except KeyError:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {sorted(ENGINES)}")
+    return engine
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def main():
+    """
+    Checks the vectorized engine against the python engine on 30000 random sentences built
+    from a small vocabulary dense in negations, modifiers, phrases and sentiment words. Every
+    score must be equal and of the same type, in one large batch and in small batches, for
+    every combination of flags and also with int multipliers.
+    """
+    import random
+    from sentiment_analyzer import SentimentAnalyzer # imported here, it imports this module
+
+    words = (["happy", "great", "outstanding"], ["sad", "bad", "awful"], ["not", "never", "isn't"],
+             ["very", "extremely", "a lot"], ["somewhat", "slightly", "a bit"])
+    vocabulary = ("happy sad great bad awful outstanding not never isn't very extremely somewhat slightly "
+                  "a bit lot the day it was , . and but").split()
+    rng = random.Random(0)
+    sentences = [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(0, 14))) for _ in range(30000)]
+
+    # analyzer whose multipliers are ints, so modified scores stay ints in the python engine
+    class IntMultiplierAnalyzer(SentimentAnalyzer):
+        INTENSIFIER_MULTIPLIER = 2
+        DOWNTONER_MULTIPLIER = 0
+
+    for analyzer_class in (SentimentAnalyzer, IntMultiplierAnalyzer):
+        python = analyzer_class(*words, tokenizer='regex', engine='python')
+        vectorized = analyzer_class(*words, tokenizer='regex', engine='vectorized')
+        for use_negation in (False, True):
+            for use_modifiers in (False, True):
+                expected = python.score_sentences(sentences, use_negation, use_modifiers)
+                for batch in (len(sentences), 5, 100):
+                    actual = []
+                    for start in range(0, len(sentences), batch):
+                        actual.extend(vectorized.score_sentences(sentences[start:start + batch], use_negation, use_modifiers))
+                    assert actual == expected, f"Failed on scores with negation={use_negation} modifiers={use_modifiers}"
+                    assert [type(score) for score in actual] == [type(score) for score in expected], \
+                        f"Failed on score types with negation={use_negation} modifiers={use_modifiers}"
+    print("All scoring engine tests passed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,651 @@
+# scoring_server.py
+# Alekya Veluri
+#
+# Long running local scoring service. An asyncio HTTP server (on a TCP port or a Unix socket) keeps
+# one warmed-up SentimentAnalyzer per configured lexicon, merges concurrent /score requests into
+# micro-batches, runs the scoring in a worker pool and reports latency percentiles per endpoint.
+#
+# Usage: python scoring_server.py [--port 8765 | --unix PATH] [--config lexicons.json] [--workers N]
+#        python scoring_server.py --self-test   (offline checks against a server on localhost)
+#
+# POST /score    {"lexicon": "default", "sentences": [...], "use_negation": true, "use_modifiers": true}
+# POST /analyze  {"lexicon": "default", "lines": [...] or "text": "...", "result_format": "dict" or "summary"}
+# GET  /stats    latency percentiles per endpoint and batching statistics
+# GET  /health   {"status": "ok", "lexicons": [...]}
+
+# import necessary libraries
+import argparse
+import asyncio
+import copy
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from sentiment_analyzer import SentimentAnalyzer, ensure_resources
+
+# reason phrase of each status code the server sends
+STATUS_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                  413: "Payload Too Large", 500: "Internal Server Error"}
+
+# result formats that can be sent back as JSON
+JSON_RESULT_FORMATS = ('dict', 'summary')
+
+# keys of a lexicon entry in the config file, in SentimentAnalyzer argument order
+LEXICON_KEYS = ('positive', 'negative', 'negation', 'intensifiers', 'downtoners')
+
+
+class RequestError(Exception):
+    """
+    A request the server rejects, with the HTTP status to answer with.
+    """
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyStats:
+    """
+    Request latencies of one endpoint. The latest max_samples latencies are kept for the
+    percentiles, while count and errors cover every request since the server started.
+    """
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __init__(self, max_samples=10000):
+        self.samples = deque(maxlen=max_samples) # seconds, most recent last
+        self.count = 0
+        self.errors = 0
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def add(self, seconds, error=False):
+        """
+        Records the latency of one request.
+        """
+        self.samples.append(seconds)
+        self.count += 1
+        if error:
+            self.errors += 1
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def to_dict(self, percentiles=(50, 90, 99)):
+        """
+        Returns the count, errors, mean, max and nearest-rank percentiles in milliseconds.
+        """
+        report = {'count': self.count, 'errors': self.errors}
+        if not self.samples:
+            return report
+        ordered = sorted(self.samples)
+        report['mean_ms'] = 1000 * sum(ordered) / len(ordered)
+        for percentile in percentiles:
+            rank = max(1, -(-percentile * len(ordered) // 100)) # ceil, at least the first sample
+            report[f'p{percentile}_ms'] = 1000 * ordered[rank - 1]
+        report['max_ms'] = 1000 * ordered[-1]
+        return report
+
+
+class MicroBatcher:
+    """
+    Merges concurrent scoring requests into one batch. Requests wait at most max_delay seconds
+    for others to join, and a batch is sent as soon as it holds max_batch_size sentences.
+    Sentences repeated across the requests of a batch are scored once.
+    """
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __init__(self, score_batch, max_batch_size=256, max_delay=0.002):
+        """
+        score_batch is a coroutine function taking a list of sentences and returning their scores.
+        """
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._pending = [] # (sentences, future) of the requests waiting for the next batch
+        self._pending_sentences = 0
+        self._timer = None
+        self._tasks = set() # batches being scored
+
+        # batching statistics
+        self.batches = 0
+        self.requests = 0
+        self.sentences = 0
+        self.unique_sentences = 0
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    async def score(self, sentences):
+        """
+        Adds sentences to the next batch and returns their scores once it has been scored.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((sentences, future))
+        self._pending_sentences += len(sentences)
+        if self._pending_sentences >= self.max_batch_size:
+            self._send()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._send)
+        return await future
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _send(self):
+        """
+        Starts scoring the pending requests as one batch.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._pending_sentences = self._pending, [], 0
+        if pending:
+            task = asyncio.ensure_future(self._score_pending(pending))
+            self._tasks.add(task) # keep a reference until the batch is done
+            task.add_done_callback(self._tasks.discard)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    async def _score_pending(self, pending):
+        """
+        Scores the unique sentences of a batch and hands each request its own scores.
+        """
+        unique = list(dict.fromkeys(sentence for sentences, _ in pending for sentence in sentences))
+        self.batches += 1
+        self.requests += len(pending)
+        self.sentences += sum(len(sentences) for sentences, _ in pending)
+        self.unique_sentences += len(unique)
+        try:
+            scores = dict(zip(unique, await self.score_batch(unique)))
+        except Exception as error:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for sentences, future in pending:
+            if not future.done(): # the client may have gone away
+                future.set_result([scores[sentence] for sentence in sentences])
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def to_dict(self):
+        """
+        Returns the batching statistics.
+        """
+        return {'batches': self.batches, 'requests': self.requests, 'sentences': self.sentences,
+                'unique_sentences': self.unique_sentences,
+                'mean_batch_size': self.sentences / self.batches if self.batches else 0.0}
+
+
+class ScoringServer:
+    """
+    HTTP/1.1 server around one SentimentAnalyzer per lexicon name. CPU work runs in a pool of
+    worker processes (or threads if use_processes is False) that each receive their own copy
+    of the analyzers once and warm them up when they start, so the event loop only parses
+    requests and dispatches batches, and no analyzer (or its cache) is shared between workers.
+    Connections are kept alive between requests.
+    """
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __init__(self, analyzers, workers=None, use_processes=True, max_batch_size=256, max_delay=0.002,
+                 max_body_size=16 * 1024 * 1024, latency_samples=10000):
+        """
+        analyzers maps lexicon names to SentimentAnalyzer objects. workers defaults to the CPU
+        count for processes and to 1 for threads, as threads share the GIL.
+        """
+        if not analyzers:
+            raise ValueError("At least one analyzer is required")
+        self.analyzers = dict(analyzers)
+        self.use_processes = use_processes
+        self.workers = workers or ((os.cpu_count() or 1) if use_processes else 1)
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.max_body_size = max_body_size
+        self.latency_samples = latency_samples
+        self.latencies = {} # "METHOD /path" -> LatencyStats
+        self._batchers = {} # (lexicon, use_negation, use_modifiers) -> MicroBatcher
+        self._executor = None
+        self._server = None
+        self._connections = set() # tasks serving open connections
+        self._routes = {('POST', '/score'): self._handle_score, ('POST', '/analyze'): self._handle_analyze,
+                        ('GET', '/stats'): self._handle_stats, ('GET', '/health'): self._handle_health}
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    async def start(self, host="127.0.0.1", port=8765, unix_path=None):
+        """
+        Starts the worker pool, waits for every worker to be warmed up and starts listening on
+        host:port (port 0 picks a free port, see the port attribute) or on the Unix socket
+        unix_path. Returns the server.
+        """
+        if self.use_processes:
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 initargs=(self.analyzers,))
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, initializer=_init_thread,
+                                                initargs=(self.analyzers,))
+
+        # one small job per worker so the pool is started before the first request
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, time.sleep, 0.01) for _ in range(self.workers)))
+
+        if unix_path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_connection, unix_path)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    @property
+    def port(self):
+        """
+        Returns the TCP port the server listens on.
+        """
+        return self._server.sockets[0].getsockname()[1]
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    async def serve_forever(self):
+        """
+        Serves requests until cancelled, then shuts down.
+        """
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    async def close(self):
+        """
+        Stops listening and shuts the worker pool down.
+        """
+        if self._server is not None:
+            self._server.close()
+            for task in list(self._connections): # idle keep-alive connections would wait forever
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    async def _run(self, lexicon, method, *args):
+        """
+        Calls a method of the lexicon's analyzer in the worker pool, on the worker's own copy.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _call_in_worker, lexicon, method, args)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    async def score(self, sentences, lexicon=None, use_negation=False, use_modifiers=False):
+        """
+        Scores sentences with the lexicon's analyzer, batched with concurrent requests.
+        """
+        lexicon = self._lexicon(lexicon)
+        key = (lexicon, bool(use_negation), bool(use_modifiers))
+        batcher = self._batchers.get(key)
+        if batcher is None:
+            # scores a whole batch in the worker pool
+            async def score_batch(batch):
+                return await self._run(lexicon, 'score_sentences', batch, key[1], key[2])
+            batcher = self._batchers[key] = MicroBatcher(score_batch, self.max_batch_size, self.max_delay)
+        return await batcher.score(sentences)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    async def analyze(self, lines, lexicon=None, use_negation=False, use_modifiers=False, result_format='dict'):
+        """
+        Runs analyze_sentiment on lines of text with the lexicon's analyzer.
+        """
+        if result_format not in JSON_RESULT_FORMATS:
+            raise RequestError(400, f"result_format must be one of {list(JSON_RESULT_FORMATS)}")
+        lexicon = self._lexicon(lexicon)
+        return await self._run(lexicon, 'analyze_sentiment', lines, bool(use_negation), bool(use_modifiers), result_format)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _lexicon(self, lexicon):
+        """
+        Returns the lexicon name to use, the only configured one or 'default' if none is given.
+        """
+        if lexicon is None:
+            lexicon = next(iter(self.analyzers)) if len(self.analyzers) == 1 else 'default'
+        if lexicon not in self.analyzers:
+            raise RequestError(404, f"Unknown lexicon '{lexicon}'")
+        return lexicon
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def stats(self):
+        """
+        Returns the latency percentiles of each endpoint and the batching statistics.
+        """
+        return {'endpoints': {name: stats.to_dict() for name, stats in sorted(self.latencies.items())},
+                'batching': {f"{lexicon} negation={negation} modifiers={modifiers}": batcher.to_dict()
+                             for (lexicon, negation, modifiers), batcher in self._batchers.items()},
+                'lexicons': list(self.analyzers), 'workers': self.workers}
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    async def _handle_score(self, request):
+        sentences = request.get('sentences')
+        if sentences is None and 'sentence' in request:
+            sentences = [request['sentence']]
+        if not isinstance(sentences, list) or not all(isinstance(sentence, str) for sentence in sentences):
+            raise RequestError(400, "'sentences' must be a list of strings")
+        use_negation = _flag(request, 'use_negation')
+        use_modifiers = _flag(request, 'use_modifiers')
+        scores = await self.score(sentences, request.get('lexicon'), use_negation, use_modifiers)
+        analyzer = self.analyzers[self._lexicon(request.get('lexicon'))]
+        return {'scores': scores, 'sentiments': [analyzer.get_sentiment(score) for score in scores]}
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    async def _handle_analyze(self, request):
+        lines = request.get('lines')
+        if lines is None and isinstance(request.get('text'), str):
+            lines = request['text'].splitlines(keepends=True)
+        if not isinstance(lines, list) or not all(isinstance(line, str) for line in lines):
+            raise RequestError(400, "'lines' must be a list of strings or 'text' a string")
+        return await self.analyze(lines, request.get('lexicon'), _flag(request, 'use_negation'),
+                                  _flag(request, 'use_modifiers'), request.get('result_format', 'dict'))
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    async def _handle_stats(self, request):
+        return self.stats()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    async def _handle_health(self, request):
+        return {'status': 'ok', 'lexicons': list(self.analyzers)}
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    async def _dispatch(self, method, path, body):
+        """
+        Routes one request and returns (status, JSON payload, latency key).
+        """
+        path = path.split('?', 1)[0]
+        handler = self._routes.get((method, path))
+        if handler is None:
+            known_path = any(route_path == path for _, route_path in self._routes)
+            return (405, {'error': f"{method} not allowed on {path}"}, None) if known_path \
+                else (404, {'error': f"No endpoint at {path}"}, None)
+
+        endpoint = f"{method} {path}"
+        try:
+            request = json.loads(body) if body else {}
+        except ValueError as error: # invalid JSON or UTF-8, any later ValueError is a server error
+            return 400, {'error': f"Invalid JSON body: {error}"}, endpoint
+        try:
+            if not isinstance(request, dict):
+                raise RequestError(400, "The request body must be a JSON object")
+            return 200, await handler(request), endpoint
+        except RequestError as error: # validation errors of the handlers
+            return error.status, {'error': str(error)}, endpoint
+        except Exception as error:
+            return 500, {'error': f"{type(error).__name__}: {error}"}, endpoint
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    async def _handle_connection(self, reader, writer):
+        """
+        Serves the requests of one connection until the client closes it or asks to.
+        """
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                start = time.perf_counter()
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    self._write_response(writer, 400, {'error': "Malformed request line"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = version == "HTTP/1.1" and headers.get('connection', '').lower() != 'close'
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                    if length < 0:
+                        raise ValueError
+                except ValueError: # the body cannot be found, so the connection cannot be reused
+                    self._write_response(writer, 400, {'error': "Invalid Content-Length header"}, False)
+                    break
+                if length > self.max_body_size:
+                    self._write_response(writer, 413, {'error': "Request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload, endpoint = await self._dispatch(method, path, body)
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if endpoint is not None:
+                    stats = self.latencies.get(endpoint)
+                    if stats is None:
+                        stats = self.latencies[endpoint] = LatencyStats(self.latency_samples)
+                    stats.add(time.perf_counter() - start, status != 200)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass # client went away mid request, or the server is closing
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _write_response(self, writer, status, payload, keep_alive):
+        """
+        Writes a JSON response.
+        """
+        body = json.dumps(payload).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {STATUS_REASONS[status]}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def _flag(request, name):
+    """
+    Returns a boolean flag of a request, False if it is missing. Anything other than a JSON
+    true or false is rejected rather than guessed.
+    """
+    value = request.get(name, False)
+    if not isinstance(value, bool):
+        raise RequestError(400, f"'{name}' must be true or false")
+    return value
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+# helpers for the worker pool
+
+# analyzers owned by the current worker process, set once by _init_worker
+_worker_analyzers = None
+
+# analyzers owned by each worker thread, set once per thread by _init_thread
+_thread_state = threading.local()
+
+def _warm_up(analyzers):
+    """Scores a sentence with each analyzer so lazy imports and tokenizer setup happen now."""
+    for analyzer in analyzers.values():
+        analyzer.score_sentences(["Warm up the analyzer."], True, True)
+
+def _init_worker(analyzers):
+    """Stores and warms up the analyzers shipped to this worker process when the pool starts."""
+    global _worker_analyzers
+    _worker_analyzers = analyzers
+    _warm_up(analyzers)
+
+def _init_thread(analyzers):
+    """Gives this worker thread its own warmed up copy of the analyzers, as a worker process gets."""
+    _thread_state.analyzers = copy.deepcopy(analyzers)
+    _warm_up(_thread_state.analyzers)
+
+def _call_in_worker(lexicon, method, args):
+    """Calls a method of one of the worker's analyzers."""
+    analyzers = getattr(_thread_state, 'analyzers', None) or _worker_analyzers
+    return getattr(analyzers[lexicon], method)(*args)
+
+#``````````````````````````````````````````````````````````````````````````````````
+def load_analyzers(config_path=None, tokenizer=None, engine=None):
+    """
+    Builds one analyzer per lexicon of a JSON config file mapping lexicon names to objects with
+    'positive', 'negative', 'negation', 'intensifiers' and 'downtoners' word lists (missing
+    lists are empty) and optional 'tokenizer' and 'engine' names. Without a config file a
+    single 'default' lexicon is built from the gbas starter lexicons.
+    """
+    if config_path is None:
+        import gbas
+        return {'default': SentimentAnalyzer(gbas.starter_positive_words, gbas.starter_negative_words,
+                                             gbas.starter_negation_words, gbas.starter_intensifiers,
+                                             gbas.starter_downtoners, tokenizer=tokenizer, engine=engine)}
+
+    with open(config_path, "r") as file:
+        config = json.load(file)
+    return {name: SentimentAnalyzer(*(entry.get(key, []) for key in LEXICON_KEYS),
+                                    tokenizer=entry.get('tokenizer', tokenizer), engine=entry.get('engine', engine))
+            for name, entry in config.items()}
+
+#``````````````````````````````````````````````````````````````````````````````````
+async def _http_request(port, method, path, payload=None, raw=None, connection=None):
+    """
+    Sends one request to the server on localhost and returns (status, JSON payload). raw is
+    sent as is instead of a request built from method, path and payload. An open
+    (reader, writer) connection is reused, otherwise a new one is opened and closed.
+    """
+    reader, writer = connection or await asyncio.open_connection("127.0.0.1", port)
+    if raw is None:
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b""
+        raw = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+    writer.write(raw)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    payload = json.loads(await reader.readexactly(int(headers['content-length'])))
+    if connection is None:
+        writer.close()
+    return status, payload
+
+#``````````````````````````````````````````````````````````````````````````````````
+async def self_test(use_processes=True, workers=2):
+    """
+    Runs the server on a free localhost port with the regex tokenizer and checks it fully
+    offline: concurrent /score requests (merged into micro-batches) and /analyze must return
+    what the analyzers return directly, keep-alive connections must serve several requests,
+    bad requests must get 400/404/405 answers, internal errors 500, and /stats must count
+    every request.
+    """
+    analyzers = load_analyzers(tokenizer='regex')
+    analyzers['tiny'] = SentimentAnalyzer(["good"], ["bad"], ["not"], ["very"], ["slightly"], tokenizer='regex')
+    reference = analyzers['default']
+
+    async with ScoringServer(analyzers, workers, use_processes, max_delay=0.005) as server:
+        await server.start(port=0)
+        port = server.port
+
+        # concurrent requests sharing a sentence are batched and each gets its own scores
+        sentences = [f"She was very happy and not sad on day {n}." for n in range(40)] + ["It was horrible!"]
+        responses = await asyncio.gather(*(_http_request(port, 'POST', '/score', {'lexicon': 'default', 'sentences': [sentence, sentences[0]],
+                                                                                  'use_negation': True, 'use_modifiers': True})
+                                           for sentence in sentences))
+        for sentence, (status, payload) in zip(sentences, responses):
+            expected = [reference.analyze_sentence_sentiment(text, True, True) for text in (sentence, sentences[0])]
+            assert status == 200 and payload['scores'] == expected, "Failed on concurrent /score requests"
+            assert payload['sentiments'] == [reference.get_sentiment(score) for score in expected], "Failed on /score sentiments"
+        batching = server.stats()['batching']['default negation=True modifiers=True']
+        assert batching['batches'] < len(sentences) and batching['unique_sentences'] < batching['sentences'], "Failed on micro-batching"
+
+        status, payload = await _http_request(port, 'POST', '/score', {'lexicon': 'tiny', 'sentence': "not good", 'use_negation': True})
+        assert (status, payload['scores']) == (200, [-1]), "Failed on a second lexicon"
+
+        lines = ["I was very happy. Then I was sad.\n", "\n", "Nothing happened at all.\n"]
+        for result_format in ('dict', 'summary'):
+            status, payload = await _http_request(port, 'POST', '/analyze', {'lines': lines, 'result_format': result_format,
+                                                                             'lexicon': 'default', 'use_modifiers': True})
+            expected = json.loads(json.dumps(reference.analyze_sentiment(lines, False, True, result_format)))
+            assert status == 200 and payload == expected, f"Failed on /analyze with result_format '{result_format}'"
+
+        # several requests on one keep-alive connection
+        connection = await asyncio.open_connection("127.0.0.1", port)
+        for _ in range(3):
+            assert await _http_request(port, 'GET', '/health', connection=connection) == (200, {'status': 'ok', 'lexicons': ['default', 'tiny']}), "Failed on keep-alive"
+        connection[1].close()
+
+        # bad requests get an error status instead of a dropped connection
+        for raw in (b"POST /score HTTP/1.1\r\nContent-Length: abc\r\n\r\n", b"POST /score HTTP/1.1\r\nContent-Length: -5\r\n\r\n",
+                    b"NONSENSE\r\n\r\n", b"POST /score HTTP/1.1\r\nContent-Length: 3\r\n\r\n{x}"):
+            assert (await _http_request(port, None, None, raw=raw))[0] == 400, f"Failed on bad request {raw!r}"
+        assert (await _http_request(port, 'POST', '/score', {'sentences': "not a list"}))[0] == 400, "Failed on bad sentences"
+        assert (await _http_request(port, 'POST', '/score', {'lexicon': "missing", 'sentences': []}))[0] == 404, "Failed on unknown lexicon"
+        assert (await _http_request(port, 'POST', '/analyze', {'lines': ["a"], 'result_format': 'columnar'}))[0] == 400, "Failed on result_format"
+        for flags in ({'use_negation': "false"}, {'use_modifiers': 1}):
+            assert (await _http_request(port, 'POST', '/score', {'sentences': ["a"], **flags}))[0] == 400, f"Failed on flags {flags}"
+            assert (await _http_request(port, 'POST', '/analyze', {'lines': ["a"], **flags}))[0] == 400, f"Failed on flags {flags}"
+        assert (await _http_request(port, 'GET', '/score'))[0] == 405, "Failed on wrong method"
+        assert (await _http_request(port, 'GET', '/nothing'))[0] == 404, "Failed on unknown path"
+
+        status, payload = await _http_request(port, 'GET', '/stats')
+        assert status == 200 and payload['endpoints']['POST /score']['count'] == len(sentences) + 6, "Failed on /stats counts"
+        assert payload['endpoints']['POST /score']['errors'] == 5, "Failed on /stats errors"
+
+        # a ValueError raised while handling a valid request is a server error, not a bad request
+        async def broken_handler(request):
+            raise ValueError("internal failure")
+        server._routes[('POST', '/broken')] = broken_handler
+        assert (await _http_request(port, 'POST', '/broken', {}))[0] == 500, "Failed on an internal ValueError"
+
+    print(f"All scoring server tests passed with {workers} worker {'processes' if use_processes else 'threads'}!")
+
+#``````````````````````````````````````````````````````````````````````````````````
+# main script for the scoring server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve sentiment scores over HTTP on the local machine.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to listen on")
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--config", metavar="FILE", help="JSON file of named lexicons")
+    parser.add_argument("--tokenizer", default=None, help="tokenizer backend ('nltk' or 'regex')")
+    parser.add_argument("--engine", default=None, help="scoring engine ('python' or 'vectorized')")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--threads", action="store_true", help="score in threads instead of processes")
+    parser.add_argument("--max-batch-size", type=int, default=256, help="sentences per micro-batch")
+    parser.add_argument("--max-delay-ms", type=float, default=2.0, help="time a request waits for a batch to fill")
+    parser.add_argument("--self-test", action="store_true", help="run the offline checks against a server on localhost and exit")
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        asyncio.run(self_test(use_processes=True))
+        asyncio.run(self_test(use_processes=False))
+        return 0
+
+    analyzers = load_analyzers(args.config, args.tokenizer, args.engine)
+    if any(analyzer.tokenizer.name == 'nltk' for analyzer in analyzers.values()): # needs the Punkt data
+        ensure_resources(download=True)
+
+    async def serve():
+        server = ScoringServer(analyzers, args.workers, not args.threads, args.max_batch_size, args.max_delay_ms / 1000)
+        await server.start(args.host, args.port, args.unix)
+        print(f"Serving {', '.join(analyzers)} on {args.unix or f'http://{args.host}:{server.port}'}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,17 +3,28 @@
 # 
 # Class which analyzes sentiment of sentences based on positive, negative, negation, and modifier words
 
-# import neccesary libraries
-import nltk
-from nltk import sent_tokenize, word_tokenize
-from nltk.data import find
+# import neccesary libraries, heavy ones (nltk, numpy, multiprocessing) are imported on first use
 import csv
-
-# Ensure NLTK 'punkt' package is downloaded for tokenization
-try:
-    find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
+import hashlib
+import time
+from contextlib import contextmanager, nullcontext
+import os
+from collections import deque
+from itertools import product
+from lexicon import LexiconIndex
+from text_tokenizers import get_tokenizer, sentence_spans, ensure_resources
+from sentiment_results import SentimentResults
+from score_cache import MISSING
+from scoring_engines import get_engine
+from instrumentation import Instrumentation
+
+# NLTK tokenizer data is no longer checked or downloaded at import time, call
+# ensure_resources() (or ensure_resources(download=True)) once before using the nltk tokenizer
+
+# version of the scoring rules, bump it whenever a change makes the same text and lexicon
+# score differently, it is part of the analyzer fingerprint so cached scores and results
+# saved by older versions are not reused
+ANALYZER_VERSION = 1
 
 class SentimentAnalyzer:
     """
@@ -53,10 +64,14 @@ class SentimentAnalyzer:
     DOWNTONER_MULTIPLIER = 0.5
 
     #``````````````````````````````````````````````````````````````````````````````````
-    def __init__(self, positive_words=None, negative_words=None, negation_words=None, intensifiers=None, downtoners=None):
+    def __init__(self, positive_words=None, negative_words=None, negation_words=None, intensifiers=None, downtoners=None, tokenizer=None, cache=None, engine=None):
         """
         Initializes the SentimentAnalyzer with optional custom lists of words. 
-        Falls back to default lists if none are provided.
+        Falls back to default lists if none are provided. The tokenizer can be 'nltk' (default),
+        'regex' for the faster precompiled-regex backend, or any object with sent_tokenize and
+        word_tokenize methods. cache is an optional SentenceScoreCache used when scoring
+        sentences. engine selects how sentences are scored, 'python' (default) scores one token
+        at a time and 'vectorized' scores batches of sentences with NumPy array operations.
         """
         self.positive_words = positive_words if positive_words is not None else self._default_positive_words
         self.negative_words = negative_words if negative_words is not None else self._default_negative_words
@@ -64,6 +79,24 @@ class SentimentAnalyzer:
         self.intensifiers = intensifiers if intensifiers is not None else self._default_intensifiers
         self.downtoners = downtoners if downtoners is not None else self._default_downtoners
 
+        # sentence and word tokenizer backend
+        self.tokenizer = get_tokenizer(tokenizer)
+
+        # compile the word lists once into a lowercase index for constant time lookups, entries
+        # are split by the same tokenizer as the sentences so contractions match as phrases
+        self.lexicon = LexiconIndex(self.positive_words, self.negative_words, self.negation_words,
+                                    self.intensifiers, self.downtoners, self.tokenizer)
+
+        # sentence scoring engine
+        self.engine = get_engine(engine)
+
+        # opt-in timings and counters, None when not instrumented
+        self.instrumentation = None
+
+        # optional sentence score cache, keyed on a fingerprint of everything that affects a score
+        self.cache = cache
+        self._fingerprint = None # computed on first use
+
 
     #``````````````````````````````````````````````````````````````````````````````````
     def analyze_sentence_sentiment(self, sentence, use_negation=False, use_modifiers=False):
@@ -72,70 +105,131 @@ class SentimentAnalyzer:
         negation, and modifier (intensifiers and downtoners) words. The function calculates a 
         sentiment score that reflects the overall sentiment of the sentence.
         """
-        # initialize sentiment_score, negation, and modifier effect
-        sentiment_score = 0
-        negation = 1
-        modifier = 1
-        negation_present = False # initially set negation_present to False 
-
-        # use tokenize to split sentence into words
-        words = nltk.word_tokenize(sentence)
-
-        for i, word in enumerate(words): # iterate over list of words and keep track of index value
-            word = word.lower() # make word lowercase
-
-            # check if word is a negation word
-            if word in self.negation_words and use_negation:
-                negation *= -1 # multiply by -1
-                negation_present = True # set negation_present to True
-                continue # move on to next word
-           
-            
-            # check if word is modifier(intensifier or downtowner)
-            if use_modifiers:
-                if word in self.intensifiers:
-                    modifier = self.INTENSIFIER_MULTIPLIER # set modifier to 1.5
-                    if negation == -1: # reset negation if it is -1
-                        negation = 1
-                    continue # move on to next word
-                elif word in self.downtoners:
-                    modifier = self.DOWNTONER_MULTIPLIER # set modifier to 0.5
-                    if negation == -1: # reset negation if it is -1
-                        negation = 1
-                    continue # move on to next word
-
-            # check if word is a positive or negative word and add to sentiment score accordingly
-            if word in self.positive_words:
-                sentiment_score += 1 * negation * modifier
-                negation = 1 # reset negation
-                # check if next word is positive/negative/modifier, and if it is not, reset negation and negation_present
-                if negation_present and i + 1 < len(words) and words[i + 1].lower() not in self.positive_words and words[i + 1].lower() not in self.negative_words and words[i + 1].lower() not in self.intensifiers and words[i + 1].lower() not in self.downtoners:
-                    negation = 1
-                    negation_present = False
-                
-            elif word in self.negative_words:
-                sentiment_score += -1 * negation * modifier
-                negation = 1 # reset negation
-                # check if next word is positive/negative/modifier, and if it is not, reset negation and negation_present
-                if negation_present and i + 1 < len(words) and words[i + 1].lower() not in self.positive_words and words[i + 1].lower() not in self.negative_words and words[i + 1].lower() not in self.intensifiers and words[i + 1].lower() not in self.downtoners:
-                    negation = 1
-                    negation_present = False
-
-            # reset negation if negation_present is True
-            if negation_present:
-                negation = 1
-                negation_present = False
-
-            # reset modifier
-            modifier = 1
-
-            
-        
-        # return a sentiment score of 0 as 0    
-        if sentiment_score == 0:
-            sentiment_score = int(0)
-            
-        return sentiment_score  
+        return self.score_sentences([sentence], use_negation, use_modifiers)[0]
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def score_sentences(self, sentences, use_negation=False, use_modifiers=False):
+        """
+        Returns the sentiment scores of a list of sentences, scored together by the analyzer's
+        engine. Sentences found in the cache are not scored again.
+        """
+        if self.instrumentation is not None:
+            self.instrumentation.count_sentences(len(sentences))
+        if self.cache is None:
+            return self.engine.score_sentences(self, sentences, use_negation, use_modifiers)
+
+        # look every sentence up in the cache first
+        keys = [self.cache.make_key(sentence, self.fingerprint, use_negation, use_modifiers) for sentence in sentences]
+        scores = [self.cache.get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is MISSING]
+
+        # score the sentences that were not cached in one batch and store them
+        if missing:
+            computed = self.engine.score_sentences(self, [sentences[i] for i in missing], use_negation, use_modifiers)
+            for i, score in zip(missing, computed):
+                scores[i] = score
+            self.cache.put_many((keys[i], score) for i, score in zip(missing, computed))
+        return scores
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def iter_sentence_scores(self, text_lines_list, use_negation=False, use_modifiers=False, with_spans=False):
+        """
+        Splits lines of text into sentences and yields (sentence, score, line_number, start, end)
+        for each one, in order. start and end are the offsets of the sentence in its line when
+        with_spans is True and None otherwise. Sentences are scored in batches of the engine's
+        batch_size.
+        """
+        for batch in self.iter_scored_batches(text_lines_list, use_negation, use_modifiers, with_spans):
+            yield from batch
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def iter_scored_batches(self, text_lines_list, use_negation=False, use_modifiers=False, with_spans=False):
+        """
+        Like iter_sentence_scores but yields each scored batch as a list of (sentence, score,
+        line_number, start, end) tuples, so callers can time the work they do per batch.
+        """
+        batch_size = self.engine.batch_size
+        stats = self.instrumentation
+        pending = [] # (sentence, line_number, start, end) waiting to be scored
+
+        for line_number, line in enumerate(text_lines_list):
+            if stats is not None:
+                split_start = time.perf_counter()
+            if with_spans:
+                pending.extend((line[start:end], line_number, start, end) for start, end in sentence_spans(self.tokenizer, line))
+            else:
+                pending.extend((sentence, line_number, None, None) for sentence in self.tokenizer.sent_tokenize(line))
+            if stats is not None:
+                stats.add_time('sentence_tokenize', time.perf_counter() - split_start)
+
+            # score a full batch
+            if len(pending) >= batch_size:
+                yield self._score_pending(pending, use_negation, use_modifiers)
+                pending = []
+
+        # score what is left
+        if pending:
+            yield self._score_pending(pending, use_negation, use_modifiers)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _score_pending(self, pending, use_negation, use_modifiers):
+        """
+        Scores a list of (sentence, line_number, start, end) and returns the (sentence, score,
+        line_number, start, end) tuples.
+        """
+        scores = self.score_sentences([item[0] for item in pending], use_negation, use_modifiers)
+        return [(sentence, score, number, start, end) for (sentence, number, start, end), score in zip(pending, scores)]
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _result_building(self):
+        """
+        Returns a context manager timing its block as the 'result_building' stage when the
+        analyzer is instrumented, and doing nothing otherwise.
+        """
+        if self.instrumentation is None:
+            return nullcontext()
+        return self.instrumentation.stage('result_building')
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    @contextmanager
+    def instrument(self, sample_callback=None, sample_every=1000, instrumentation=None):
+        """
+        Context manager which collects per-stage timings and counters for everything the
+        analyzer does inside its block, and yields the Instrumentation object. Pass an existing
+        instrumentation to keep accumulating into it. With sample_callback, a snapshot is
+        passed to the callback every sample_every sentences. Instrumentation is collected in
+        the current process only, not in analyze_many workers.
+        """
+        if instrumentation is None:
+            instrumentation = Instrumentation(sample_callback, sample_every)
+        previous = self.instrumentation
+        self.instrumentation = instrumentation
+        try:
+            yield instrumentation
+        finally:
+            self.instrumentation = previous
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    @property
+    def fingerprint(self):
+        """
+        Fingerprint of everything that affects a score, computed on first use.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = self.compute_fingerprint()
+        return self._fingerprint
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def compute_fingerprint(self):
+        """
+        Returns a hex digest of the compiled lexicon, the modifier multipliers, the tokenizer and
+        ANALYZER_VERSION. Cached scores and stored results are only reused by analyzers with the
+        same fingerprint.
+        """
+        tokenizer_name = getattr(self.tokenizer, 'name', type(self.tokenizer).__name__)
+        settings = (f"{ANALYZER_VERSION}|{self.lexicon.fingerprint()}|{self.INTENSIFIER_MULTIPLIER}|"
+                    f"{self.DOWNTONER_MULTIPLIER}|{tokenizer_name}")
+        return hashlib.sha1(settings.encode('utf-8')).hexdigest()
 
     #``````````````````````````````````````````````````````````````````````````````````
     def get_sentiment(self, sentiment_score):
@@ -165,69 +259,205 @@ class SentimentAnalyzer:
     #``````````````````````````````````````````````````````````````````````````````````
     def get_sentences_from_lines(self, text_lines_list):
         """
-        Converts a list of text lines into a list of sentences using NLTK's sentence tokenizer.
+        Converts a list of text lines into a list of sentences using the analyzer's sentence tokenizer.
         """
         sentences = [] # create empty list
-        for i in text_lines_list: # add sentences to list using nltk.sent_tokenize
-            sentences.extend(nltk.sent_tokenize(i))
+        for i in text_lines_list: # add sentences to list using the tokenizer backend
+            sentences.extend(self.tokenizer.sent_tokenize(i))
         return sentences
 
     #``````````````````````````````````````````````````````````````````````````````````
-    def analyze_sentiment(self, text_lines_list, use_negation=False, use_modifiers=False):
+    def analyze_sentiment(self, text_lines_list, use_negation=False, use_modifiers=False, result_format='dict'):
         """
-        Analyzes the overall sentiment of multiple lines of text.     
+        Analyzes the overall sentiment of multiple lines of text.
+        result_format selects the shape of the result:
+        'dict'     - detailed results, overall sentiment and sentiment counts as nested dicts
+        'columnar' - a SentimentResults object with scores, int8 labels and sentence offsets in arrays
+        'summary'  - only the overall sentiment and sentiment counts, no per-sentence data is kept
+        'estimate' - like 'summary' but estimated from a sample of lines, see estimate_sentiment
         """
-        # create empty lists
+        if result_format == 'columnar':
+            return self._analyze_columnar(text_lines_list, use_negation, use_modifiers)
+        if result_format == 'estimate':
+            return self.estimate_sentiment(text_lines_list, use_negation, use_modifiers)
+        if result_format not in ('dict', 'summary'):
+            raise ValueError(f"Unknown result_format '{result_format}', expected 'dict', 'columnar', 'summary' or 'estimate'")
+        keep_details = result_format == 'dict'
+
+        # create empty list, running total and counts, all updated in a single pass
         detailed_results = []
-        sentiment_scores = []
-
-        # iterate over lines and then sentences
-        for i in text_lines_list:
-            sentences = nltk.sent_tokenize(i)
-            for sentence in sentences:
-
-                sentiment_score = self.analyze_sentence_sentiment(sentence, use_negation, use_modifiers) # get sentiment score from function
-                sentiment_scores.append(sentiment_score) # add sentiment score to list
-                sentiment = self.get_sentiment(sentiment_score) # get sentiment from function
-            
-                detailed_results.append({'sentiment': sentiment, 'score': sentiment_score, 'sentence': sentence}) # add sentiment, score, and sentence to detailed_results dictionary
-
-        overall_sentiment_score = self.calculate_overall_sentiment_score(sentiment_scores) # get overall sentiment score from function
-        overall_sentiment = self.get_sentiment(overall_sentiment_score) # get overall sentiment from function
-
-        sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0} # create dictionary and initialize counts 
-        for element in detailed_results: # iterate over sentiment in detailed results
-                                         
-            if element['sentiment'] == 'positive': # add 1 to positive if 'positive' is present
-                sentiment_counts['positive'] += 1
-                                         
-            elif element['sentiment'] == 'negative': # add 1 to negative if 'negative' is present
-                sentiment_counts['negative'] += 1
-                
-            elif element['sentiment'] == 'neutral': # add 1 to neutral if 'neutral' is present
-                sentiment_counts['neutral'] += 1
-                
-        # return detailed results, overall sentiment and score, and sentiment counts
-        return {'detailed_results': detailed_results, 'overall_sentiment': {'overall_sentiment': overall_sentiment, 'score': overall_sentiment_score}, 'sentiment_counts': sentiment_counts} 
-        
+        total_score = 0
+        sentence_count = 0
+        sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+
+        # iterate over the scored batches of sentences, timing the work on each as result building
+        for batch in self.iter_scored_batches(text_lines_list, use_negation, use_modifiers):
+            with self._result_building():
+                for sentence, sentiment_score, _, _, _ in batch:
+                    sentiment = self.get_sentiment(sentiment_score) # get sentiment from function
+                    total_score += sentiment_score
+                    sentence_count += 1
+                    sentiment_counts[sentiment] += 1 # count the sentiment
+
+                    if keep_details:
+                        detailed_results.append({'sentiment': sentiment, 'score': sentiment_score, 'sentence': sentence}) # add sentiment, score, and sentence to detailed_results dictionary
+
+        with self._result_building():
+            overall_sentiment_score = total_score / sentence_count if sentence_count > 0 else 0 # average sentiment score
+            overall_sentiment = self.get_sentiment(overall_sentiment_score) # get overall sentiment from function
+            overall = {'overall_sentiment': overall_sentiment, 'score': overall_sentiment_score}
+
+        # return overall sentiment and score and sentiment counts, plus detailed results in dict format
+        if not keep_details:
+            return {'overall_sentiment': overall, 'sentiment_counts': sentiment_counts}
+        return {'detailed_results': detailed_results, 'overall_sentiment': overall, 'sentiment_counts': sentiment_counts}
 
     #``````````````````````````````````````````````````````````````````````````````````
-    def write_to_csv(self, detailed_results, csv_file_path):
+    def estimate_sentiment(self, text_lines_list, use_negation=False, use_modifiers=False, tolerance=0.05,
+                           confidence=0.95, time_budget=None, strata=10, batch_lines=200, seed=0):
+        """
+        Estimates the overall sentiment score from a stratified random sample of lines instead
+        of scoring every sentence, sampling until the confidence interval is within tolerance
+        of the estimate or time_budget seconds have passed. Returns the 'summary' result with
+        an added 'estimate' dict holding the interval, see sampling.estimate_sentiment.
+        """
+        from sampling import estimate_sentiment # statistics and random are only loaded when sampling
+        return estimate_sentiment(self, text_lines_list, use_negation, use_modifiers, tolerance,
+                                  confidence, time_budget, strata, batch_lines, seed)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _analyze_columnar(self, text_lines_list, use_negation, use_modifiers):
+        """
+        Analyzes lines of text into a SentimentResults object, storing sentence offsets instead of text.
+        """
+        lines = text_lines_list if isinstance(text_lines_list, list) else list(text_lines_list)
+        with self._result_building():
+            results = SentimentResults(lines)
+        for batch in self.iter_scored_batches(lines, use_negation, use_modifiers, with_spans=True):
+            with self._result_building():
+                for _, sentiment_score, line_number, start, end in batch:
+                    results.append(sentiment_score, line_number, start, end)
+        return results
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def analyze_many(self, documents, use_negation=False, use_modifiers=False, workers=None, chunksize=1, result_format='dict'):
+        """
+        Analyzes many documents (each a list of text lines, e.g. one chapter) across a pool of
+        worker processes. The analyzer, with its compiled lexicon, is sent to each worker once
+        when the pool starts. Results are returned in the same order as the documents.
+        workers=None uses every CPU core and workers=1 runs serially in this process.
+        """
+        if workers == 1: # no pool needed
+            return [self.analyze_sentiment(lines, use_negation, use_modifiers, result_format) for lines in documents]
+
+        with _process_pool(self, workers) as executor:
+            jobs = ((lines, use_negation, use_modifiers, result_format) for lines in documents)
+            return list(executor.map(_analyze_in_worker, jobs, chunksize=chunksize))
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def iter_analyze_many(self, documents, use_negation=False, use_modifiers=False, workers=None, max_pending=None, result_format='dict'):
+        """
+        Lazy version of analyze_many. Documents are pulled from the iterable only as workers
+        free up, with at most max_pending (default twice the worker count) in flight, and
+        results are yielded in input order. Memory stays bounded for arbitrarily long streams.
+        """
+        if workers == 1: # no pool needed
+            for lines in documents:
+                yield self.analyze_sentiment(lines, use_negation, use_modifiers, result_format)
+            return
+
+        jobs = ((lines, use_negation, use_modifiers, result_format) for lines in documents)
+        yield from _iter_in_pool(self, _analyze_in_worker, jobs, workers, max_pending)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def analyze_corpus(self, file_paths, use_negation=False, use_modifiers=False, workers=None, chunksize=1, result_format='dict'):
+        """
+        Analyzes many text files across a pool of worker processes. Each worker reads its own
+        files so only the paths and the results travel between processes. Results are returned
+        in the same order as file_paths.
+        """
+        if workers == 1: # no pool needed
+            return [_analyze_file(self, path, use_negation, use_modifiers, result_format) for path in file_paths]
+
+        with _process_pool(self, workers) as executor:
+            jobs = ((path, use_negation, use_modifiers, result_format) for path in file_paths)
+            return list(executor.map(_analyze_file_in_worker, jobs, chunksize=chunksize))
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def iter_analyze_corpus(self, file_paths, use_negation=False, use_modifiers=False, workers=None, max_pending=None, result_format='dict'):
         """
-        Writes the detailed sentiment analysis results to a CSV file.
+        Lazy version of analyze_corpus. Each worker reads its own files, at most max_pending
+        (default twice the worker count) are in flight, and results are yielded in the order
+        of file_paths.
         """
-        myfile = open(csv_file_path, 'w', newline = '') # open file for writing 
-        writer = csv.writer(myfile) # object to write rows to CSV file
+        if workers == 1: # no pool needed
+            for path in file_paths:
+                yield _analyze_file(self, path, use_negation, use_modifiers, result_format)
+            return
 
-        # Write header row to CSV file
-        writer.writerow('Sentiment', 'Score', 'Sentence')
-        # Iterate over the results and write each one as a row in CSV file
-        for i in detailed_results:
-            writer.writerow(i)
+        jobs = ((path, use_negation, use_modifiers, result_format) for path in file_paths)
+        yield from _iter_in_pool(self, _analyze_file_in_worker, jobs, workers, max_pending)
 
-        # Close file
-        myfile.close()
+    #``````````````````````````````````````````````````````````````````````````````````
+    def write_to_csv(self, detailed_results, csv_file_path):
+        """
+        Writes the detailed sentiment analysis results to a CSV file. detailed_results can be
+        the list from analyze_sentiment or any iterable of result dicts, such as a generator,
+        and is written as it is consumed.
+        """
+        with open(csv_file_path, 'w', newline = '') as myfile: # open file for writing
+            writer = csv.writer(myfile) # object to write rows to CSV file
+
+            # Write header row to CSV file
+            writer.writerow(['Sentiment', 'Score', 'Sentence'])
+            # Write one row per result
+            writer.writerows((i['sentiment'], i['score'], i['sentence']) for i in detailed_results)
         
+#``````````````````````````````````````````````````````````````````````````````````
+# helpers for the process pool used by analyze_many and analyze_corpus
+
+# analyzer owned by the current worker process, set once by _init_worker
+_worker_analyzer = None
+
+def _process_pool(analyzer, workers):
+    """Creates a process pool whose workers each receive the analyzer once, when they start."""
+    from concurrent.futures import ProcessPoolExecutor # multiprocessing is only imported by batch jobs
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(analyzer,))
+
+def _iter_in_pool(analyzer, function, jobs, workers, max_pending):
+    """Yields function(job) for each job from a process pool in order, with at most max_pending jobs in flight."""
+    if max_pending is None:
+        max_pending = 2 * (workers or os.cpu_count() or 1)
+    with _process_pool(analyzer, workers) as executor:
+        pending = deque() # futures in submission order
+        for job in jobs:
+            pending.append(executor.submit(function, job))
+            if len(pending) >= max_pending: # wait for the oldest before reading further
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _init_worker(analyzer):
+    """Stores the analyzer shipped to this worker process when the pool starts."""
+    global _worker_analyzer
+    _worker_analyzer = analyzer
+
+def _analyze_in_worker(job):
+    """Analyzes one list of text lines with the worker's analyzer."""
+    lines, use_negation, use_modifiers, result_format = job
+    return _worker_analyzer.analyze_sentiment(lines, use_negation, use_modifiers, result_format)
+
+def _analyze_file(analyzer, path, use_negation, use_modifiers, result_format):
+    """Reads a text file and analyzes all of its lines."""
+    with open(path, "r") as file:
+        return analyzer.analyze_sentiment(file.readlines(), use_negation, use_modifiers, result_format)
+
+def _analyze_file_in_worker(job):
+    """Analyzes one text file with the worker's analyzer."""
+    path, use_negation, use_modifiers, result_format = job
+    return _analyze_file(_worker_analyzer, path, use_negation, use_modifiers, result_format)
+
+
 #``````````````````````````````````````````````````````````````````````````````````
 def main():
     """
@@ -237,61 +467,71 @@ def main():
     sentiment score for a given sentence under specified conditions (use of negation and modifiers).
     Additional complex test cases mix multiple aspects of sentiment analysis to ensure the method
     can handle a variety of sentence structures and sentiment expressions accurately.
+    All test cases are run once for each tokenizer backend and scoring engine.
     """
+    ensure_resources(download=True) # the nltk tokenizer needs the Punkt data
     
-    analyzer = SentimentAnalyzer(["happy", "outstanding", "great", "positive"],["sad", "disappointing", "bad"],\
-                                    ["not", "never"],["very", "extremely","definitely"],["somewhat", "slightly"])
+    # run every test case with both tokenizer backends and both engines, the scores must be identical
+    for tokenizer, engine in product(('nltk', 'regex'), ('python', 'vectorized')):
+        analyzer = SentimentAnalyzer(["happy", "outstanding", "great", "positive"],["sad", "disappointing", "bad"],\
+                                        ["not", "never"],["very", "extremely","definitely"],["somewhat", "slightly"], tokenizer=tokenizer, engine=engine)
 
-    # Test case 1: Positive keyword
-    assert analyzer.analyze_sentence_sentiment("This is a great day.") == 1, "Failed on positive keyword test"
+        # Test case 1: Positive keyword
+        assert analyzer.analyze_sentence_sentiment("This is a great day.") == 1, "Failed on positive keyword test"
 
-    # Test case 2: Negative keyword
-    assert analyzer.analyze_sentence_sentiment("This is a sad day.") == -1, "Failed on negative keyword test"
+        # Test case 2: Negative keyword
+        assert analyzer.analyze_sentence_sentiment("This is a sad day.") == -1, "Failed on negative keyword test"
 
-    # Test case 3: Negation of a positive word (without use_negation=True should be treated as positive)
-    # this test will fail because of the "a" between the negation and the positive word.
-    #
-    #assert analyzer.analyze_sentence_sentiment("This is not a great day.", use_negation=True) == -1, "Failed on negation test"
+        # Test case 3: Negation of a positive word (without use_negation=True should be treated as positive)
+        # this test will fail because of the "a" between the negation and the positive word.
+        #
+        #assert analyzer.analyze_sentence_sentiment("This is not a great day.", use_negation=True) == -1, "Failed on negation test"
 
-    # Test case 3: Negation of a positive word (without use_negation=True should be treated as positive)
-    assert analyzer.analyze_sentence_sentiment("This day is not great.", use_negation=True) == -1, "Failed on negation test"
+        # Test case 3: Negation of a positive word (without use_negation=True should be treated as positive)
+        assert analyzer.analyze_sentence_sentiment("This day is not great.", use_negation=True) == -1, "Failed on negation test"
 
-    # Test case 4: Modified negation of a positive word (without use_negation=True should be treated as positive)
-    assert analyzer.analyze_sentence_sentiment("This is definitely not great.", use_negation=True, use_modifiers=True) == -1.5, "Failed on intensify/downtone a negation test"
+        # Test case 4: Modified negation of a positive word (without use_negation=True should be treated as positive)
+        assert analyzer.analyze_sentence_sentiment("This is definitely not great.", use_negation=True, use_modifiers=True) == -1.5, "Failed on intensify/downtone a negation test"
 
-    # Test case 5: Intensified positive word
-    assert analyzer.analyze_sentence_sentiment("This is a very great day.", use_modifiers=True) == 1.5, "Failed on intensifier test"
+        # Test case 5: Intensified positive word
+        assert analyzer.analyze_sentence_sentiment("This is a very great day.", use_modifiers=True) == 1.5, "Failed on intensifier test"
 
-    # Test case 6: Downtoned negative word
-    assert analyzer.analyze_sentence_sentiment("This is somewhat disappointing.", use_modifiers=True) == -0.5, "Failed on downtoner test"
-    
-    print("All simple sentence tests passed!")        
+        # Test case 6: Downtoned negative word
+        assert analyzer.analyze_sentence_sentiment("This is somewhat disappointing.", use_modifiers=True) == -0.5, "Failed on downtoner test"
+
+        print(f"All simple sentence tests passed with the {tokenizer} tokenizer and {engine} engine!")
+
+        canalyzer = SentimentAnalyzer(["happy", "outstanding", "great"], ["bad", "awful","disappointing"], ["not", "never"], ["very", "extremely","definitely"], ["somewhat", "slightly"], tokenizer=tokenizer, engine=engine)
+
+        # Mixed sentiment with negation and modifier
+        assert canalyzer.analyze_sentence_sentiment("This is a great day, but somewhat disappointing.", use_negation=True, use_modifiers=True) == 0.5, "Failed on mixed sentiment with negation and modifier"
 
-    canalyzer = SentimentAnalyzer(["happy", "outstanding", "great"], ["bad", "awful","disappointing"], ["not", "never"], ["very", "extremely","definitely"], ["somewhat", "slightly"])
+        # Intensified positive followed by a downtoned negative
+        assert canalyzer.analyze_sentence_sentiment("It was very outstanding yet slightly bad.", use_modifiers=True) == 1, "Failed on intensified positive followed by downtoned negative"
 
-    # Mixed sentiment with negation and modifier
-    assert canalyzer.analyze_sentence_sentiment("This is a great day, but somewhat disappointing.", use_negation=True, use_modifiers=True) == 0.5, "Failed on mixed sentiment with negation and modifier"
+        # Negated positive followed by an unmodified negative
+        assert canalyzer.analyze_sentence_sentiment("This is not happy and also awful.", use_negation=True) == -2, "Failed on negated positive followed by unmodified negative"
 
-    # Intensified positive followed by a downtoned negative
-    assert canalyzer.analyze_sentence_sentiment("It was very outstanding yet slightly bad.", use_modifiers=True) == 1, "Failed on intensified positive followed by downtoned negative"
+        # Multiple modifiers with a negation impacting different parts of the sentence
+        assert canalyzer.analyze_sentence_sentiment("It was definitely not great, but somewhat bad.", use_negation=True, use_modifiers=True) == -2, "Failed on multiple modifiers with negation"
 
-    # Negated positive followed by an unmodified negative
-    assert canalyzer.analyze_sentence_sentiment("This is not happy and also awful.", use_negation=True) == -2, "Failed on negated positive followed by unmodified negative"
+        # Sentences with neutral words and sentiment words without explicit modifiers or negations
+        assert canalyzer.analyze_sentence_sentiment("The day was outstanding then turned awful.", use_negation=True, use_modifiers=True) == 0, "Failed on sentence with neutral shift"
 
-    # Multiple modifiers with a negation impacting different parts of the sentence
-    assert canalyzer.analyze_sentence_sentiment("It was definitely not great, but somewhat bad.", use_negation=True, use_modifiers=True) == -2, "Failed on multiple modifiers with negation"
+        # Mixed sentiment with multiple modifiers and negation
+        assert canalyzer.analyze_sentence_sentiment("This is extremely bad but not somewhat outstanding.", use_negation=True, use_modifiers=True) == -1, "Failed on mixed sentiment with multiple modifiers and negation"
 
-    # Sentences with neutral words and sentiment words without explicit modifiers or negations
-    assert canalyzer.analyze_sentence_sentiment("The day was outstanding then turned awful.", use_negation=True, use_modifiers=True) == 0, "Failed on sentence with neutral shift"
+        # Complex sentence with negation impacting multiple sentiment words
+        assert canalyzer.analyze_sentence_sentiment("This is not happy day, but it is definitely not awful.", use_negation=True, use_modifiers=True) == 0.5, "Failed on complex sentence with negation impacting multiple sentiment words"
 
-    # Mixed sentiment with multiple modifiers and negation
-    assert canalyzer.analyze_sentence_sentiment("This is extremely bad but not somewhat outstanding.", use_negation=True, use_modifiers=True) == -1, "Failed on mixed sentiment with multiple modifiers and negation"
+        print(f"All complex sentence tests passed with the {tokenizer} tokenizer and {engine} engine!")
 
-    # Complex sentence with negation impacting multiple sentiment words
-    assert canalyzer.analyze_sentence_sentiment("This is not happy day, but it is definitely not awful.", use_negation=True, use_modifiers=True) == 0.5, "Failed on complex sentence with negation impacting multiple sentiment words"
+        # Contractions in the word lists match however the tokenizer splits them
+        nanalyzer = SentimentAnalyzer(["great"], ["bad", "fail"], ["isn't", "can't", "cannot"], ["very"], ["a bit"], tokenizer=tokenizer, engine=engine)
+        assert nanalyzer.analyze_sentence_sentiment("This day isn't great.", use_negation=True) == -1, "Failed on contracted negation"
+        assert nanalyzer.analyze_sentence_sentiment("It can't fail and it cannot fail.", use_negation=True) == 2, "Failed on can't and cannot"
+        assert nanalyzer.analyze_sentence_sentiment("It is a bit bad.", use_modifiers=True) == -0.5, "Failed on phrase downtoner"
 
-    print("All complex sentence tests passed!")
-                                                
     print("All tests passed!")
 
     
@@ -0,0 +1,114 @@
+# sentiment_results.py
+# Alekya Veluri
+#
+# Columnar container for per-sentence sentiment results. Scores, label codes and sentence
+# offsets are kept in compact arrays, and the dict-of-dicts format is built only on demand.
+
+# import necessary libraries
+from array import array
+
+# label codes stored per sentence
+POSITIVE_CODE = 1
+NEGATIVE_CODE = -1
+NEUTRAL_CODE = 0
+
+# label string for each code
+LABELS = {POSITIVE_CODE: 'positive', NEGATIVE_CODE: 'negative', NEUTRAL_CODE: 'neutral'}
+
+
+class SentimentResults:
+    """
+    Per-sentence results of SentimentAnalyzer.analyze_sentiment in columnar form. Each sentence
+    is stored as a float score in an array('d'), an int8 label code in an array('b') and its
+    (line number, start, end) offsets into the source lines, so no sentence strings are copied.
+    The sentiment counts are kept up to date as sentences are appended. Indexing with
+    'detailed_results', 'overall_sentiment' or 'sentiment_counts' returns the same values as
+    the dict result format.
+    """
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __init__(self, lines):
+        """
+        Creates empty result columns for the given list of source text lines.
+        """
+        self.lines = lines
+        self.scores = array('d')
+        self.labels = array('b')
+        self.line_numbers = array('l')
+        self.starts = array('l')
+        self.ends = array('l')
+        self.sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def append(self, score, line_number, start, end):
+        """
+        Adds the score of the sentence lines[line_number][start:end] and updates the counts.
+        """
+        code = (score > 0) - (score < 0) # 1, -1 or 0
+        self.scores.append(score)
+        self.labels.append(code)
+        self.line_numbers.append(line_number)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.sentiment_counts[LABELS[code]] += 1
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __len__(self):
+        """
+        Returns the number of sentences.
+        """
+        return len(self.scores)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def sentence(self, index):
+        """
+        Returns the text of one sentence, sliced from the source line.
+        """
+        return self.lines[self.line_numbers[index]][self.starts[index]:self.ends[index]]
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def overall_score(self):
+        """
+        Returns the average sentence score, or 0 if there are no sentences.
+        """
+        if len(self.scores) > 0:
+            return sum(self.scores) / len(self.scores)
+        return 0
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def overall_sentiment(self):
+        """
+        Returns the overall sentiment and score in the same form as the dict result format.
+        """
+        score = self.overall_score()
+        code = (score > 0) - (score < 0)
+        return {'overall_sentiment': LABELS[code], 'score': score}
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def detailed_results(self):
+        """
+        Builds the list of {'sentiment', 'score', 'sentence'} dicts of the dict result format.
+        """
+        return [{'sentiment': LABELS[self.labels[i]], 'score': self.scores[i], 'sentence': self.sentence(i)}
+                for i in range(len(self.scores))]
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def to_dict(self):
+        """
+        Builds the full dict result format returned by analyze_sentiment by default.
+        """
+        return {'detailed_results': self.detailed_results(), 'overall_sentiment': self.overall_sentiment(),
+                'sentiment_counts': dict(self.sentiment_counts)}
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __getitem__(self, key):
+        """
+        Dict-style access to the parts of the dict result format, built on demand.
+        """
+        if key == 'detailed_results':
+            return self.detailed_results()
+        if key == 'overall_sentiment':
+            return self.overall_sentiment()
+        if key == 'sentiment_counts':
+            return dict(self.sentiment_counts)
+        raise KeyError(key)
@@ -0,0 +1,198 @@
+# smoothing.py
+# Alekya Veluri
+#
+# Vectorized smoothing of sentiment score series with NumPy: simple, centered and exponential
+# moving averages, plus a streaming moving average that updates in constant time per score.
+
+# import necessary libraries
+import math
+from collections import deque
+import numpy as np
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+# function which computes the trailing moving average of a series with cumulative sums
+
+def simple_moving_average(values, window_size=20):
+    """
+    Returns the trailing moving average of values as a float array. Position i holds the mean of
+    values[i-window_size+1:i+1], the warm-up positions with fewer than window_size values are NaN.
+    Runs in O(n) regardless of the window size.
+    """
+    values = np.asarray(values, dtype=float)
+    if window_size < 1:
+        raise ValueError("window_size must be at least 1")
+    averages = np.full(len(values), np.nan) # NaN for the warm-up region
+    if len(values) >= window_size:
+        sums = np.cumsum(values) # running totals, sums[i] - sums[i-w] is the window total
+        window_sums = sums[window_size - 1:].copy()
+        window_sums[1:] -= sums[:-window_size]
+        averages[window_size - 1:] = window_sums / window_size
+    return averages
+
+#``````````````````````````````````````````````````````````````````````````````````
+# function which computes the moving average of a window centered on each value
+
+def centered_moving_average(values, window_size=20):
+    """
+    Returns the moving average of a window centered on each value as a float array. For an even
+    window the extra value is taken after the center. Positions too close to either end for a
+    full window are NaN.
+    """
+    averages = simple_moving_average(values, window_size)
+    shift = window_size // 2 # trailing window ending at i+shift is centered on i
+    centered = np.full(len(averages), np.nan)
+    if shift:
+        centered[:-shift] = averages[shift:]
+    else:
+        centered[:] = averages
+    return centered
+
+#``````````````````````````````````````````````````````````````````````````````````
+# function which computes the exponential moving average in vectorized blocks
+
+def exponential_moving_average(values, alpha=None, span=None):
+    """
+    Returns the exponential moving average y[i] = alpha * values[i] + (1 - alpha) * y[i-1], starting
+    from y[0] = values[0]. Give either alpha (0 < alpha <= 1) or span (alpha = 2 / (span + 1)).
+    The recurrence is solved in closed form over blocks short enough for the decay weights to
+    stay in floating point range, so each block is a single cumulative sum.
+    """
+    if (alpha is None) == (span is None):
+        raise ValueError("Give exactly one of alpha or span")
+    if alpha is None:
+        alpha = 2.0 / (span + 1.0)
+    if not 0 < alpha <= 1:
+        raise ValueError("alpha must be in (0, 1]")
+
+    values = np.asarray(values, dtype=float)
+    averages = np.empty(len(values))
+    if len(values) == 0:
+        return averages
+    if alpha == 1: # no memory, the average is the series itself
+        averages[:] = values
+        return averages
+
+    # largest block for which decay ** -block stays below 1e150
+    decay = 1.0 - alpha
+    block = max(1, int(150 * math.log(10) / -math.log(decay)))
+
+    # starting from previous = values[0] makes y[0] = values[0]
+    previous = values[0]
+    for begin in range(0, len(values), block):
+        chunk = values[begin:begin + block]
+        powers = decay ** np.arange(1, len(chunk) + 1) # decay ** (k + 1) for position k in the block
+        # y[k] = decay**(k+1) * (previous + alpha * sum over j <= k of x[j] / decay**(j+1))
+        averages[begin:begin + len(chunk)] = powers * (previous + alpha * np.cumsum(chunk / powers))
+        previous = averages[begin + len(chunk) - 1]
+    return averages
+
+
+class MovingAverage:
+    """
+    Streaming trailing moving average. update() adds one score and returns the current average
+    in O(1), or None until window_size scores have been seen. The running total is recomputed
+    from the window once every window_size updates so rounding errors do not accumulate.
+    """
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __init__(self, window_size=20):
+        """
+        Creates an empty moving average over the last window_size scores.
+        """
+        if window_size < 1:
+            raise ValueError("window_size must be at least 1")
+        self.window_size = window_size
+        self.window = deque()
+        self.total = 0.0
+        self.updates = 0 # updates since the total was last recomputed
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def update(self, value):
+        """
+        Adds one score and returns the moving average, or None during the warm-up.
+        """
+        self.window.append(value)
+        self.total += value
+        if len(self.window) > self.window_size:
+            self.total -= self.window.popleft()
+
+        # recompute the running total once per window to keep it exact
+        self.updates += 1
+        if self.updates >= self.window_size:
+            self.total = math.fsum(self.window)
+            self.updates = 0
+        return self.value()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def value(self):
+        """
+        Returns the current moving average, or None during the warm-up.
+        """
+        if len(self.window) < self.window_size:
+            return None
+        return self.total / self.window_size
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def main():
+    """
+    Checks every average against a plain Python loop like the original gbas moving_average on
+    random series of several lengths, including series shorter than the window, and checks
+    MovingAverage against the trailing average after every update of a long stream.
+    """
+    import random
+    rng = random.Random(0)
+
+    # trailing mean of the window ending at i, the baseline loop, None in the warm-up
+    def loop_average(values, window_size, i):
+        if i + 1 < window_size:
+            return None
+        return sum(values[i - window_size + 1:i + 1]) / window_size
+
+    # True if a NumPy result matches a baseline value, NaN standing for None
+    def matches(actual, expected):
+        if expected is None:
+            return math.isnan(actual)
+        return abs(actual - expected) < 1e-9
+
+    for length in (0, 1, 5, 19, 20, 21, 500):
+        values = [rng.choice((-2, -1.5, -1, -0.5, 0, 0.5, 1, 1.5, 2)) * rng.random() for _ in range(length)]
+        for window_size in (1, 2, 7, 20):
+            simple = simple_moving_average(values, window_size)
+            assert len(simple) == length, "Failed on simple moving average length"
+            assert all(matches(simple[i], loop_average(values, window_size, i)) for i in range(length)), "Failed on simple moving average"
+
+            centered = centered_moving_average(values, window_size)
+            shift = window_size // 2
+            assert all(matches(centered[i], loop_average(values, window_size, i + shift) if i + shift < length else None)
+                       for i in range(length)), "Failed on centered moving average"
+
+        for alpha in (0.05, 0.3, 1.0):
+            expected = []
+            for value in values:
+                expected.append(value if not expected else alpha * value + (1 - alpha) * expected[-1])
+            actual = exponential_moving_average(values, alpha=alpha)
+            assert all(abs(a - e) < 1e-9 for a, e in zip(actual, expected)) and len(actual) == length, "Failed on exponential moving average"
+        assert np.allclose(exponential_moving_average(values, span=9), exponential_moving_average(values, alpha=0.2)), "Failed on span"
+
+    # a long series with a small alpha crosses several blocks of the closed form
+    values = [rng.uniform(-3, 3) for _ in range(20000)]
+    expected = values[0]
+    for value, actual in zip(values, exponential_moving_average(values, alpha=0.001)):
+        expected = 0.001 * value + 0.999 * expected # the first step leaves values[0] unchanged
+        assert abs(actual - expected) < 1e-9, "Failed on exponential moving average over many blocks"
+
+    # the streaming average agrees with the trailing average at every step
+    for window_size in (1, 3, 20):
+        average = MovingAverage(window_size)
+        for i, value in enumerate(values[:3000]):
+            expected = loop_average(values, window_size, i)
+            actual = average.update(value)
+            assert (actual is None) == (expected is None) and (actual is None or abs(actual - expected) < 1e-9), "Failed on MovingAverage"
+
+    print("All smoothing tests passed!")
+
+
+if __name__ == "__main__":
+    main()
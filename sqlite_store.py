@@ -0,0 +1,85 @@
+# sqlite_store.py
+# Alekya Veluri
+#
+# SQLite plumbing shared by SentenceScoreCache and ResultStore. Connections are opened lazily in
+# autocommit mode with WAL and a busy timeout, every write is one short explicit transaction, and
+# pickled copies keep only their configuration so each worker process opens its own connection.
+
+# import necessary libraries, sqlite3 is imported when a database is first opened
+from contextlib import contextmanager
+
+
+class SQLiteBacked:
+    """
+    Base class of objects kept in a SQLite database at self.path. Subclasses set path,
+    busy_timeout (seconds a writer waits for another process) and _connection = None in
+    __init__, create their tables in _create_tables, and list the __init__ arguments a
+    pickled copy is rebuilt from in _state_fields.
+    """
+
+    # __init__ arguments kept when pickling
+    _state_fields = ()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _database(self):
+        """
+        Returns the SQLite connection, opening it on first use (also after being sent to a worker).
+        """
+        if self._connection is None:
+            import sqlite3 # only needed when a database is used
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL") # readers do not block the writer
+            connection.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+            self._create_tables(connection)
+            self._connection = connection
+        return self._connection
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def _create_tables(self, connection):
+        """
+        Creates the tables and indexes of the subclass if they do not exist yet.
+        """
+        raise NotImplementedError
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    @contextmanager
+    def _write(self):
+        """
+        Yields the connection inside a BEGIN IMMEDIATE transaction, so one process writes at a
+        time and the others wait up to busy_timeout. Commits on success and rolls back on error.
+        """
+        database = self._database()
+        database.execute("BEGIN IMMEDIATE")
+        try:
+            yield database
+        except BaseException:
+            database.execute("ROLLBACK")
+            raise
+        database.execute("COMMIT")
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def close(self):
+        """
+        Closes the connection.
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def __getstate__(self):
+        """
+        Pickles the configuration only, so a copy sent to a worker process starts fresh and
+        opens its own connection.
+        """
+        return {name: getattr(self, name) for name in self._state_fields}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
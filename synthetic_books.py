@@ -0,0 +1,51 @@
+# synthetic_books.py
+# Alekya Veluri
+#
+# Deterministic synthetic Gutenberg style books built from the gbas starter lexicons, used by the
+# benchmark harness and by the checks of the modules that read whole books.
+
+# import necessary libraries
+import random
+
+import gbas
+
+# filler words mixed in between lexicon words
+filler_words = [
+    "the", "a", "and", "of", "to", "in", "was", "her", "his", "it", "that", "with", "for", "she",
+    "he", "had", "as", "at", "which", "but", "be", "on", "not", "by", "all", "have", "so", "could",
+    "sister", "mother", "letter", "house", "morning", "evening", "walk", "dance", "felt", "said"
+]
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+# function which generates a synthetic Gutenberg style book
+
+def generate_book(chapters=40, lines_per_chapter=120, seed=0, lexicon_ratio=0.2):
+    """
+    Returns the lines of a deterministic synthetic book with Gutenberg START/END markers, a
+    "CHAPTER" heading per chapter, an epilogue and prose where about lexicon_ratio of the words
+    come from the gbas starter lexicons. The same arguments always give the same book.
+    """
+    rng = random.Random(seed)
+    lexicon_words = (gbas.starter_positive_words + gbas.starter_negative_words + gbas.starter_negation_words
+                     + gbas.starter_intensifiers + gbas.starter_downtoners)
+
+    # random sentence of 6 to 24 words
+    def sentence():
+        words = [rng.choice(lexicon_words) if rng.random() < lexicon_ratio else rng.choice(filler_words)
+                 for _ in range(rng.randint(6, 24))]
+        return " ".join(words).capitalize() + rng.choice(".!?")
+
+    lines = ["The Project Gutenberg eBook of a Synthetic Novel\n", "\n",
+             f"{gbas.gutenberg_start_phrase} A SYNTHETIC NOVEL ***\n", "\n", "Preface line.\n"]
+    for number in range(1, chapters + 1):
+        lines.extend(["\n", f"CHAPTER {number}.\n", "\n"])
+        for _ in range(lines_per_chapter):
+            # blank lines between paragraphs, otherwise one to three sentences per line
+            if rng.random() < 0.1:
+                lines.append("\n")
+            else:
+                lines.append(" ".join(sentence() for _ in range(rng.randint(1, 3))) + "\n")
+    lines.extend(["\n", "Epilogue\n", "\n", sentence() + "\n", "\n",
+                  f"{gbas.gutenberg_end_phrase} A SYNTHETIC NOVEL ***\n", "License text.\n"])
+    return lines
@@ -0,0 +1,223 @@
+# text_tokenizers.py
+# Alekya Veluri
+#
+# Sentence and word tokenizer backends for SentimentAnalyzer. The NLTK backend wraps Punkt and
+# the Treebank word tokenizer, the regex backend uses precompiled patterns and is much faster.
+
+# import necessary libraries, nltk is imported the first time the NLTK backend is used
+import re
+
+# nltk module, set by _nltk() on first use
+_nltk_module = None
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def _nltk():
+    """
+    Imports nltk on first use and returns the module.
+    """
+    global _nltk_module
+    if _nltk_module is None:
+        import nltk
+        _nltk_module = nltk
+    return _nltk_module
+
+#``````````````````````````````````````````````````````````````````````````````````
+def ensure_resources(download=False, quiet=True):
+    """
+    Checks that the Punkt sentence tokenizer data used by the NLTK backend is installed
+    ('punkt_tab' on recent NLTK releases, 'punkt' on older ones). Missing data is downloaded
+    if download is True, otherwise a LookupError explains how to install it. Nothing is
+    checked or downloaded at import time, so call this once before using the NLTK backend.
+    """
+    nltk = _nltk()
+    from nltk.tokenize import punkt
+    package = 'punkt_tab' if hasattr(punkt, 'PunktTokenizer') else 'punkt'
+    try:
+        nltk.data.find(f'tokenizers/{package}')
+        return
+    except LookupError:
+        if not download:
+            raise LookupError(f"NLTK data '{package}' is missing, run nltk.download('{package}') "
+                              f"or ensure_resources(download=True)")
+    if not nltk.download(package, quiet=quiet):
+        raise LookupError(f"Could not download NLTK data '{package}'")
+
+
+class NLTKTokenizer:
+    """
+    Tokenizer backend using NLTK's sent_tokenize (Punkt) and word_tokenize (Treebank).
+    This is the default backend of SentimentAnalyzer. nltk is imported on first use, see
+    ensure_resources for the tokenizer data.
+    """
+
+    name = 'nltk'
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def sent_tokenize(self, text):
+        """
+        Splits a block of text into a list of sentences.
+        """
+        return _nltk().sent_tokenize(text)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def word_tokenize(self, sentence):
+        """
+        Splits a sentence into a list of word and punctuation tokens.
+        """
+        return _nltk().word_tokenize(sentence)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def entry_tokens(self, entry):
+        """
+        Splits a lexicon entry into tokens the same way word_tokenize splits it inside a
+        sentence ("isn't" becomes "is", "n't"), without the Punkt data word_tokenize needs.
+        """
+        return _nltk().word_tokenize(entry, preserve_line=True)
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def sentence_spans(self, text):
+        """
+        Yields (start, end) offsets of each sentence in text. Punkt sentences are slices of
+        the input, so each one is located after the end of the previous one.
+        """
+        return find_sentence_spans(text, self.sent_tokenize(text))
+
+
+class RegexTokenizer:
+    """
+    Tokenizer backend built on precompiled regular expressions. Words keep their contractions
+    ("can't", "isn't") and hyphens together so they match the negation lists directly, curly
+    apostrophes are normalized to straight ones, and punctuation runs become separate tokens.
+    Sentences end at '.', '!' or '?' (plus any closing quotes or brackets) followed by
+    whitespace, except after common abbreviations such as "Mr." or single initials.
+    """
+
+    name = 'regex'
+
+    # word tokens, letters/digits with inner apostrophes or hyphens, or a run of punctuation
+    WORD_PATTERN = re.compile(r"[^\W_]+(?:['\-][^\W_]+)*|[^\w\s]+|_+")
+
+    # candidate sentence ends, terminal punctuation with optional closing quotes and brackets
+    SENTENCE_END_PATTERN = re.compile(r"[.!?]+[\"')\]”’]*(?=\s|$)")
+
+    # word immediately before a candidate sentence end
+    LAST_WORD_PATTERN = re.compile(r"(?<!\w)([^\W\d_]+)\.$")
+
+    # abbreviations that do not end a sentence
+    ABBREVIATIONS = frozenset([
+        "mr", "mrs", "ms", "dr", "st", "jr", "sr", "prof", "rev", "hon", "gen", "col",
+        "capt", "lt", "sgt", "messrs", "mme", "mlle", "vs", "etc", "vol", "ch"
+    ])
+
+    # translation table for curly quotes, applied before word matching
+    APOSTROPHES = str.maketrans({"’": "'", "‘": "'"})
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def sentence_spans(self, text):
+        """
+        Yields (start, end) offsets of each sentence in text, with surrounding whitespace excluded.
+        """
+        start = 0
+        length = len(text)
+        for match in self.SENTENCE_END_PATTERN.finditer(text):
+            end = match.end()
+
+            # do not split after abbreviations ("Mr.") or single initials ("J.")
+            if match.group() == '.':
+                last_word = self.LAST_WORD_PATTERN.search(text, max(start, end - 12), end)
+                if last_word is not None:
+                    word = last_word.group(1)
+                    if (len(word) == 1 and word.isupper()) or word.lower() in self.ABBREVIATIONS:
+                        continue
+
+            # skip leading whitespace and yield the sentence
+            while start < end and text[start].isspace():
+                start += 1
+            if start < end:
+                yield start, end
+            start = end
+
+        # anything after the last terminal punctuation is a sentence of its own
+        while start < length and text[start].isspace():
+            start += 1
+        end = length
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            yield start, end
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def sent_tokenize(self, text):
+        """
+        Splits a block of text into a list of sentences.
+        """
+        return [text[start:end] for start, end in self.sentence_spans(text)]
+
+    #``````````````````````````````````````````````````````````````````````````````````
+    def word_tokenize(self, sentence):
+        """
+        Splits a sentence into a list of word and punctuation tokens.
+        """
+        return self.WORD_PATTERN.findall(sentence.translate(self.APOSTROPHES))
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def find_sentence_spans(text, sentences):
+    """
+    Yields (start, end) offsets of already split sentences by locating each one in text after
+    the end of the previous one. Raises ValueError if a sentence is not a substring of text.
+    """
+    position = 0
+    for sentence in sentences:
+        start = text.find(sentence, position)
+        if start < 0:
+            raise ValueError(f"Sentence {sentence!r} is not a substring of the text")
+        position = start + len(sentence)
+        yield start, position
+
+#``````````````````````````````````````````````````````````````````````````````````
+def sentence_spans(tokenizer, text):
+    """
+    Returns the (start, end) sentence offsets of text for any tokenizer backend, using its
+    sentence_spans method when it has one and locating its sent_tokenize output otherwise.
+    """
+    spans = getattr(tokenizer, 'sentence_spans', None)
+    if spans is not None:
+        return spans(text)
+    return find_sentence_spans(text, tokenizer.sent_tokenize(text))
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def entry_tokens(tokenizer, entry):
+    """
+    Returns the tokens of a lexicon entry for any tokenizer backend, using its entry_tokens
+    method when it has one and its word_tokenize otherwise.
+    """
+    split_entry = getattr(tokenizer, 'entry_tokens', None)
+    if split_entry is not None:
+        return split_entry(entry)
+    return tokenizer.word_tokenize(entry)
+
+
+# tokenizer backends by name
+TOKENIZERS = {
+    NLTKTokenizer.name: NLTKTokenizer,
+    RegexTokenizer.name: RegexTokenizer,
+}
+
+
+#``````````````````````````````````````````````````````````````````````````````````
+def get_tokenizer(tokenizer=None):
+    """
+    Returns a tokenizer backend. Accepts None (the NLTK default), a backend name
+    ('nltk' or 'regex') or any object with sent_tokenize and word_tokenize methods.
+    """
+    if tokenizer is None:
+        return NLTKTokenizer()
+    if isinstance(tokenizer, str):
+        try:
+            return TOKENIZERS[tokenizer]()
+        except KeyError:
+            raise ValueError(f"Unknown tokenizer '{tokenizer}', expected one of {sorted(TOKENIZERS)}")
+    return tokenizer